@@ -0,0 +1,125 @@
+import statistics
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.authentication import token_cache
+
+BATCH_SIZE = 5000
+
+
+def get_request_host():
+    """Return a host name the site accepts, for building requests."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def bulk_create_in_batches(model, objs):
+    """Insert ``objs`` holding only one batch in memory at a time.
+
+    ``bulk_create`` turns its argument into a list first, which for
+    millions of rows takes gigabytes.
+    """
+    objs = iter(objs)
+    while batch := list(islice(objs, BATCH_SIZE)):
+        model.objects.bulk_create(batch)
+
+
+@contextmanager
+def request_cycle():
+    """Run code between the signals that start and finish a request."""
+    request_started.send(sender=None)
+    try:
+        yield
+    finally:
+        request_finished.send(sender=None)
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    token_cache.clear()
+
+
+class BenchmarkCommand(BaseCommand):
+    """Time API requests against data generated for the benchmark.
+
+    The data goes into a fresh test database (``test_<NAME>``) that is
+    dropped afterwards, so real data is never touched. Subclasses create
+    it in ``populate`` and time their cases in ``run_cases``; both get
+    the command options.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Timed runs of every case.')
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        self.factory = APIRequestFactory()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        # Like the test client, keep the connection open across requests.
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            started = time.perf_counter()
+            self.populate(**options)
+            self.stdout.write(
+                f'Data generated in {time.perf_counter() - started:.1f} s '
+                f'on {connection.vendor}.'
+            )
+            self.run_cases(**options)
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def get(self, path, user=None, **params):
+        """Run a GET through the API and return the rendered response."""
+        request = self.factory.get(path, params, HTTP_HOST=get_request_host())
+        if user is not None:
+            force_authenticate(request, user)
+        match = resolve(path)
+        with request_cycle():
+            response = match.func(request, *match.args, **match.kwargs)
+            response.render()
+        if response.status_code != status.HTTP_200_OK:
+            raise CommandError(
+                f'GET {path} {params} returned {response.status_code}.')
+        return response
+
+    def measure(self, label, run, cold=True):
+        """Time ``run()`` and print the median, the slowest run and the
+        number of queries.
+
+        With ``cold`` the caches are cleared before every run, so the
+        database work is measured rather than cache hits.
+        """
+        timings = []
+        for _ in range(self.repeat):
+            if cold:
+                clear_caches()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f'{label:<48} {statistics.median(timings):9.1f} ms median '
+            f'{max(timings):9.1f} ms max {len(queries):4} queries'
+        )
+        return timings
@@ -0,0 +1,220 @@
+import hashlib
+import time
+from operator import itemgetter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipes.catalog import get_catalog_version
+from recipes.models import Recipe
+
+KEY_PREFIX = 'responses:recipes:'
+LIST_GENERATION_KEY = KEY_PREFIX + 'list-generation'
+RECIPE_VERSION_KEY = KEY_PREFIX + 'version:{}'
+FRAGMENT_KEY = KEY_PREFIX + 'fragment:{}'
+STATS_KEY = KEY_PREFIX + 'stats:{}:{}'
+LIST, DETAIL, FRAGMENT = 'list', 'detail', 'fragment'
+KINDS = (LIST, DETAIL, FRAGMENT)
+HIT, MISS = 'hit', 'miss'
+CACHE_STATUS_HEADER = 'X-Cache'
+
+
+def get_response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def is_process_local(cache):
+    """Whether the cache, and so its counters, live in one process."""
+    return isinstance(cache, LocMemCache)
+
+
+def get_version(cache, key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def normalize_query(query_params):
+    """Return the query string with keys sorted and empty values dropped.
+
+    Repeated values keep their order, as the last one wins for most
+    parameters.
+    """
+    return urlencode(sorted(
+        (
+            (key, value)
+            for key, values in query_params.lists()
+            for value in values
+            if value
+        ),
+        key=itemgetter(0)
+    ))
+
+
+def build_key(kind, *parts):
+    digest = hashlib.sha256(
+        '|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'{KEY_PREFIX}{kind}:{digest}'
+
+
+def get_list_key(request, cache):
+    return build_key(
+        LIST,
+        request.build_absolute_uri('/'),
+        get_version(cache, LIST_GENERATION_KEY),
+        get_catalog_version(),
+        normalize_query(request.query_params)
+    )
+
+
+def get_detail_key(request, cache, recipe_id):
+    return build_key(
+        DETAIL,
+        request.build_absolute_uri('/'),
+        recipe_id,
+        get_version(cache, RECIPE_VERSION_KEY.format(recipe_id)),
+        get_catalog_version()
+    )
+
+
+def record_stat(cache, kind, outcome, count=1):
+    if not count:
+        return
+    key = STATS_KEY.format(kind, outcome)
+    try:
+        cache.incr(key, count)
+    except ValueError:
+        cache.set(key, count, timeout=None)
+
+
+def get_stats():
+    """Return ``{kind: {'hit': n, 'miss': n}}`` since the last reset."""
+    cache = get_response_cache()
+    keys = {
+        STATS_KEY.format(kind, outcome): (kind, outcome)
+        for kind in KINDS
+        for outcome in (HIT, MISS)
+    }
+    stats = {kind: {HIT: 0, MISS: 0} for kind in KINDS}
+    for key, value in cache.get_many(keys).items():
+        kind, outcome = keys[key]
+        stats[kind][outcome] = value
+    return stats
+
+
+def reset_stats():
+    get_response_cache().delete_many([
+        STATS_KEY.format(kind, outcome)
+        for kind in KINDS
+        for outcome in (HIT, MISS)
+    ])
+
+
+def cached_response(request, kind, get_key, get_response):
+    """Serve anonymous GETs from the shared response cache.
+
+    Anonymous viewers never have favorites, a cart or subscriptions, so
+    their payload depends on the URL alone. The response data is cached
+    rather than the rendered body, which keeps content negotiation
+    working; authenticated requests bypass the cache.
+    """
+    if request.method != 'GET' or request.user.is_authenticated:
+        return get_response()
+    cache = get_response_cache()
+    key = get_key(cache)
+    data = cache.get(key)
+    if data is not None:
+        record_stat(cache, kind, HIT)
+        response = Response(data)
+        response[CACHE_STATUS_HEADER] = 'HIT'
+        return response
+    record_stat(cache, kind, MISS)
+    response = get_response()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, response.data, settings.RESPONSE_CACHE_TTL)
+    response[CACHE_STATUS_HEADER] = 'MISS'
+    return response
+
+
+def get_recipe_fragments(recipes, render):
+    """Return ``{recipe_id: fragment}`` for the recipes.
+
+    A fragment is the viewer-independent part of a recipe payload. It is
+    stored with the recipe version and the catalog version it was
+    rendered from, so versions and fragments come back in a single
+    multi-get; ``render(recipes)`` is only called for the misses.
+    """
+    cache = get_response_cache()
+    catalog_version = get_catalog_version()
+    version_keys = {
+        recipe.id: RECIPE_VERSION_KEY.format(recipe.id) for recipe in recipes}
+    fragment_keys = {
+        recipe.id: FRAGMENT_KEY.format(recipe.id) for recipe in recipes}
+    found = cache.get_many([*version_keys.values(), *fragment_keys.values()])
+    fragments = {}
+    for recipe_id, key in fragment_keys.items():
+        version = found.get(version_keys[recipe_id])
+        entry = found.get(key)
+        if version is not None and entry is not None and (
+            entry[0] == (version, catalog_version)
+        ):
+            fragments[recipe_id] = entry[1]
+    missing = [recipe for recipe in recipes if recipe.id not in fragments]
+    record_stat(cache, FRAGMENT, HIT, len(fragments))
+    record_stat(cache, FRAGMENT, MISS, len(missing))
+    if not missing:
+        return fragments
+    rendered = render(missing)
+    cache.set_many({
+        fragment_keys[recipe_id]: (
+            (
+                found.get(version_keys[recipe_id])
+                or get_version(cache, version_keys[recipe_id]),
+                catalog_version
+            ),
+            fragment
+        )
+        for recipe_id, fragment in rendered.items()
+    }, settings.RESPONSE_CACHE_TTL)
+    fragments.update(rendered)
+    return fragments
+
+
+def invalidate_recipes(recipe_ids):
+    """Drop cached lists and the cached details and fragments of recipes.
+
+    Nothing is deleted: lists move to a new generation and each recipe
+    to a new version, so a response computed from the old data can never
+    be stored under the new keys.
+    """
+    cache = get_response_cache()
+    version = time.time_ns()
+    cache.set_many({
+        RECIPE_VERSION_KEY.format(recipe_id): version
+        for recipe_id in recipe_ids
+    }, timeout=None)
+    cache.set(LIST_GENERATION_KEY, version, timeout=None)
+
+
+def invalidate_recipes_on_commit(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    transaction.on_commit(lambda: invalidate_recipes(recipe_ids))
+
+
+def invalidate_author_on_commit(author_id):
+    """Invalidate every recipe showing the author once the change is in."""
+
+    def invalidate():
+        recipe_ids = list(Recipe.objects.filter(
+            author_id=author_id).values_list('id', flat=True))
+        if recipe_ids:
+            invalidate_recipes(recipe_ids)
+
+    transaction.on_commit(invalidate)
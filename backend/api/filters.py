@@ -1,41 +1,271 @@
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import (
+    BigIntegerField,
+    Case,
+    Count,
+    F,
+    FloatField,
+    Func,
+    IntegerField,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
 from django_filters import rest_framework as filters
 
-from recipes.models import Ingredient, Recipe
+from api.utils import favorited_by, in_shopping_cart_of
+from recipes.catalog import get_catalog
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+
+def get_tag_slug_choices():
+    return [(tag.slug, tag.name) for tag in get_catalog().tags]
+
+
+def is_postgresql(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def count_ingredient_matches(ingredient_ids):
+    """Per recipe, count its ingredients inside and outside the set.
+
+    Join-based stand-in for the ``ingredient_ids`` array on backends
+    other than PostgreSQL.
+    """
+    in_set = Q(ingredient_id__in=ingredient_ids)
+    return (
+        RecipeIngredient.objects
+        .filter(ingredient__isnull=False)
+        .values('recipe_id')
+        .annotate(
+            matched=Count('id', filter=in_set),
+            missing=Count('id', filter=~in_set)
+        )
+        .order_by()
+    )
+
+
+def ingredient_array():
+    """The ``ingredient_ids`` array column of recipes on PostgreSQL.
+
+    Migration 0011 creates it on PostgreSQL only and it is not a model
+    field, so it is read as raw SQL.
+    """
+    return RawSQL(
+        '"recipes_recipe"."ingredient_ids"', (),
+        output_field=ArrayField(BigIntegerField())
+    )
+
+
+class MissingIngredientCount(Func):
+    """Number of array elements that are not in the given ID array."""
+
+    output_field = IntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        array_sql, array_params = compiler.compile(self.source_expressions[0])
+        ids_sql, ids_params = compiler.compile(self.source_expressions[1])
+        return (
+            f'cardinality(ARRAY(SELECT unnest({array_sql}) '
+            f'EXCEPT SELECT unnest({ids_sql})))',
+            (*array_params, *ids_params)
+        )
+
+
+# Shorter values have no trigrams to search with, only prefix matches.
+TRIGRAM_MIN_LENGTH = 3
+# ``ordering`` values and the columns they sort by; each is backed by
+# an index.
+ORDERINGS = {
+    'popular': ('-favorites_count', '-id'),
+    'trending': ('-trending_score', '-id'),
+}
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Comma-separated list of IDs."""
 
 
 class RecipeFilter(filters.FilterSet):
-    """Filter recipes by tags, author, is_favorited, is_in_shopping_cart."""
+    """Filter recipes by tags, author, is_favorited, is_in_shopping_cart.
+
+    The two flags are correlated ``EXISTS`` subqueries, answered from the
+    ``(user_id, recipe_id)`` indexes behind the ``unique_favorite`` and
+    ``unique_cart_item`` constraints without joining the relations.
+    """
 
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tags__slug',
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_slug_choices,
+        method='filter_tags',
         label='Filter by tag slug'
     )
     author = filters.NumberFilter(
         field_name='author__id',
         label='Filter by author ID'
     )
+    search = filters.CharFilter(
+        method='filter_search',
+        label='Full-text search in name and text'
+    )
+    ingredients = NumberInFilter(
+        method='filter_ingredients',
+        label='Recipes containing all of these ingredient IDs'
+    )
+    ingredients_any = NumberInFilter(
+        method='filter_ingredients_any',
+        label='Recipes containing any of these ingredient IDs'
+    )
+    available_ingredients = NumberInFilter(
+        method='filter_available_ingredients',
+        label='Recipes that can be cooked from these ingredient IDs'
+    )
+    max_missing = filters.NumberFilter(
+        method='filter_max_missing',
+        label='Ingredients a recipe may need beyond available_ingredients'
+    )
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    # Declared last so that it overrides the order of a search.
+    ordering = filters.ChoiceFilter(
+        choices=[(value, value) for value in ORDERINGS],
+        method='filter_ordering',
+        label='Sort order'
+    )
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
+        fields = [
+            'tags', 'author', 'search',
+            'ingredients', 'ingredients_any',
+            'available_ingredients', 'max_missing',
+            'is_favorited', 'is_in_shopping_cart', 'ordering'
+        ]
+
+    def filter_tags(self, queryset, name, value):
+        """Keep recipes with any of the tags, as a semi-join.
+
+        Matching through an ``IN`` subquery instead of joining the tags
+        returns every recipe once, without a ``DISTINCT``.
+        """
+        tag_ids = [tag.id for tag in get_catalog().tags if tag.slug in value]
+        return queryset.filter(id__in=Recipe.tags.through.objects.filter(
+            tag_id__in=tag_ids).values('recipe_id'))
+
+    def filter_search(self, queryset, name, value):
+        """Match recipes against the query, best ranked first.
+
+        PostgreSQL uses the indexed ``search_vector``; other backends get
+        a ``LIKE`` stand-in that ranks name matches above text ones.
+        """
+        if connections[queryset.db].vendor == 'postgresql':
+            query = SearchQuery(
+                value, config=settings.SEARCH_CONFIG, search_type='websearch')
+            return queryset.filter(search_vector=query).annotate(
+                search_rank=SearchRank(F('search_vector'), query)
+            ).order_by('-search_rank', '-id')
+        return queryset.filter(
+            Q(name__icontains=value) | Q(text__icontains=value)
+        ).annotate(
+            search_rank=Case(
+                When(name__icontains=value, then=Value(1.0)),
+                default=Value(0.5),
+                output_field=FloatField()
+            )
+        ).order_by('-search_rank', '-id')
+
+    def filter_ingredients(self, queryset, name, value):
+        ingredient_ids = sorted({int(item) for item in value})
+        if is_postgresql(queryset):
+            return queryset.alias(
+                ingredient_array=ingredient_array()
+            ).filter(ingredient_array__contains=ingredient_ids)
+        return queryset.filter(id__in=count_ingredient_matches(
+            ingredient_ids
+        ).filter(matched=len(ingredient_ids)).values('recipe_id'))
+
+    def filter_ingredients_any(self, queryset, name, value):
+        ingredient_ids = sorted({int(item) for item in value})
+        if is_postgresql(queryset):
+            return queryset.alias(
+                ingredient_array=ingredient_array()
+            ).filter(ingredient_array__overlap=ingredient_ids)
+        return queryset.filter(id__in=RecipeIngredient.objects.filter(
+            ingredient_id__in=ingredient_ids).values('recipe_id'))
+
+    def filter_available_ingredients(self, queryset, name, value):
+        """Keep recipes missing at most ``max_missing`` ingredients.
+
+        Only recipes using at least one of the available ingredients are
+        considered, which lets PostgreSQL narrow them down through the
+        GIN index on ``ingredient_ids`` before counting.
+        """
+        ingredient_ids = sorted({int(item) for item in value})
+        max_missing = int(self.form.cleaned_data.get('max_missing') or 0)
+        if is_postgresql(queryset):
+            return queryset.alias(
+                ingredient_array=ingredient_array()
+            ).filter(
+                ingredient_array__overlap=ingredient_ids
+            ).alias(
+                missing_ingredients=MissingIngredientCount(
+                    'ingredient_array',
+                    Value(ingredient_ids, output_field=ArrayField(
+                        BigIntegerField()))
+                )
+            ).filter(missing_ingredients__lte=max_missing)
+        return queryset.filter(id__in=count_ingredient_matches(
+            ingredient_ids
+        ).filter(
+            matched__gt=0, missing__lte=max_missing
+        ).values('recipe_id'))
+
+    def filter_max_missing(self, queryset, name, value):
+        # Applied together with available_ingredients.
+        return queryset
 
     def filter_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
-            return queryset.filter(favorited_by__user=self.request.user)
+            return queryset.filter(favorited_by(self.request.user))
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
-            return queryset.filter(in_shopping_carts__user=self.request.user)
+            return queryset.filter(in_shopping_cart_of(self.request.user))
         return queryset
 
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*ORDERINGS[value])
+
 
 class IngredientFilter(filters.FilterSet):
-    name = filters.CharFilter(field_name='name', lookup_expr='istartswith')
+    """Autocomplete ingredients by name, prefix matches first.
+
+    Lookups go through ``lower(name)`` so that Postgres can serve them
+    from the ``text_pattern_ops`` and ``pg_trgm`` indexes.
+    """
+
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ['name']
+
+    def filter_name(self, queryset, name, value):
+        value = value.lower()
+        queryset = queryset.alias(name_lower=Lower('name'))
+        if len(value) < TRIGRAM_MIN_LENGTH:
+            return queryset.filter(
+                name_lower__startswith=value).order_by('name_lower')
+        return queryset.filter(name_lower__contains=value).order_by(
+            Case(
+                When(name_lower__startswith=value, then=Value(0)),
+                default=Value(1)
+            ),
+            'name_lower'
+        )
@@ -0,0 +1,54 @@
+from django.db import connection
+
+from api.benchmarks import BenchmarkCommand, bulk_create_in_batches
+from api.filters import IngredientFilter
+from recipes.models import Ingredient
+
+URL = '/api/ingredients/'
+WORDS = (
+    'apple', 'bean', 'butter', 'carrot', 'cheese', 'chicken', 'flour',
+    'garlic', 'lemon', 'milk', 'onion', 'pepper', 'potato', 'rice',
+    'salmon', 'salt', 'sugar', 'tomato', 'vanilla', 'walnut',
+)
+UNITS = ('g', 'ml', 'pcs', 'tbsp')
+
+
+class Command(BenchmarkCommand):
+    help = 'Time ingredient autocomplete over a large ingredient table.'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--ingredients', type=int, default=1_000_000,
+            help='Ingredients in the table.')
+
+    def populate(self, ingredients, **options):
+        bulk_create_in_batches(Ingredient, (
+            Ingredient(
+                name=(f'{WORDS[number % len(WORDS)]} '
+                      f'{WORDS[number // len(WORDS) % len(WORDS)]} '
+                      f'{number}'),
+                measurement_unit=UNITS[number % len(UNITS)],
+            )
+            for number in range(ingredients)
+        ))
+
+    def run_cases(self, **options):
+        for label, params in (
+            ('1-letter prefix, limit=10', {'name': 's', 'limit': 10}),
+            ('2-letter prefix, limit=10', {'name': 'sa', 'limit': 10}),
+            ('word prefix, limit=10', {'name': 'salt', 'limit': 10}),
+            ('rare prefix, limit=10', {'name': 'salt walnut 99', 'limit': 10}),
+            ('substring, limit=10', {'name': 'mon', 'limit': 10}),
+            ('rare substring, limit=10', {'name': 'nut 12345', 'limit': 10}),
+            ('no match, limit=10', {'name': 'zzz', 'limit': 10}),
+            ('word prefix, limit=100', {'name': 'salt', 'limit': 100}),
+        ):
+            self.measure(label, lambda: self.get(URL, **params))
+        if connection.vendor == 'postgresql':
+            # The plans show whether the lower(name) indexes are used.
+            for value in ('sa', 'mon'):
+                queryset = IngredientFilter(
+                    {'name': value}, queryset=Ingredient.objects.all()).qs
+                self.stdout.write(f'Plan for {value!r}:')
+                self.stdout.write(queryset[:10].explain())
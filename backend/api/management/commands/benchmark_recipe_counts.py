@@ -0,0 +1,77 @@
+from django.db.models import Max, Min
+
+from api.benchmarks import (
+    BenchmarkCommand,
+    bulk_create_in_batches,
+    clear_caches,
+)
+from recipes.models import Recipe, Tag
+from users.models import User
+
+URL = '/api/recipes/'
+
+
+class Command(BenchmarkCommand):
+    help = 'Time the count modes of the recipe list over a large table.'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--recipes', type=int, default=5_000_000,
+            help='Recipes in the table.')
+
+    def populate(self, recipes, **options):
+        self.viewer = User.objects.create_user(
+            username='viewer', email='viewer@example.com')
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            recipes_count=recipes)
+        bulk_create_in_batches(Recipe, (
+            Recipe(
+                author=author,
+                name=f'Recipe {number}',
+                text='Mix and cook.',
+                cooking_time=20,
+                image='recipes/images/benchmark.png',
+            )
+            for number in range(recipes)
+        ))
+        # Every recipe gets one of the tags, in turn.
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        self.tag = Tag.objects.get(pk=tag_ids[0])
+        bounds = Recipe.objects.aggregate(first=Min('id'), last=Max('id'))
+        RecipeTag = Recipe.tags.through
+        bulk_create_in_batches(RecipeTag, (
+            RecipeTag(
+                recipe_id=recipe_id,
+                tag_id=tag_ids[recipe_id % len(tag_ids)]
+            )
+            for recipe_id in range(bounds['first'], bounds['last'] + 1)
+        ))
+
+    def run_cases(self, **options):
+        # Authenticated requests bypass the response cache, so only the
+        # pagination differs between the cases.
+        for scope, filters in (
+            ('all', {}),
+            ('one tag', {'tags': self.tag.slug}),
+        ):
+            for label, params in (
+                ('page number, exact count', {}),
+                ('page number, count=estimate', {'count': 'estimate'}),
+                ('keyset, no count', {'pagination': 'keyset'}),
+                ('keyset, count=exact',
+                 {'pagination': 'keyset', 'count': 'exact'}),
+                ('keyset, count=estimate',
+                 {'pagination': 'keyset', 'count': 'estimate'}),
+            ):
+                self.measure(f'{scope}: {label}', lambda: self.get(
+                    URL, self.viewer, **filters, **params))
+            clear_caches()
+            self.get(URL, self.viewer, **filters, count='estimate')
+            self.measure(
+                f'{scope}: page number, count=estimate, warm',
+                lambda: self.get(URL, self.viewer, **filters,
+                                 count='estimate'),
+                cold=False
+            )
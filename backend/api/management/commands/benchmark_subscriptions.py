@@ -0,0 +1,62 @@
+from api.benchmarks import BenchmarkCommand, bulk_create_in_batches
+from recipes.models import Recipe
+from users.models import Subscription, User
+
+URL = '/api/users/subscriptions/'
+
+
+class Command(BenchmarkCommand):
+    help = ('Time the subscriptions feed of a user following many '
+            'prolific authors.')
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--authors', type=int, default=1000,
+            help='Authors the user follows.')
+        parser.add_argument(
+            '--recipes', type=int, default=500,
+            help='Recipes of every author.')
+
+    def populate(self, authors, recipes, **options):
+        self.follower = User.objects.create_user(
+            username='follower', email='follower@example.com')
+        bulk_create_in_batches(User, (
+            User(
+                username=f'author{number}',
+                email=f'author{number}@example.com',
+                recipes_count=recipes,
+                followers_count=1,
+            )
+            for number in range(authors)
+        ))
+        author_ids = list(User.objects.exclude(
+            pk=self.follower.pk).values_list('id', flat=True))
+        bulk_create_in_batches(Subscription, (
+            Subscription(user=self.follower, author_id=author_id)
+            for author_id in author_ids
+        ))
+        bulk_create_in_batches(Recipe, (
+            Recipe(
+                author_id=author_id,
+                name=f'Recipe {number}',
+                text='Mix and cook.',
+                cooking_time=20,
+                image='recipes/images/benchmark.png',
+            )
+            for author_id in author_ids
+            for number in range(recipes)
+        ))
+
+    def run_cases(self, authors, **options):
+        last_page = max(1, -(-authors // 6))
+        for label, params in (
+            ('first page, recipes_limit=3', {'recipes_limit': 3}),
+            ('last page, recipes_limit=3',
+             {'recipes_limit': 3, 'page': last_page}),
+            ('keyset page, recipes_limit=3',
+             {'recipes_limit': 3, 'pagination': 'keyset'}),
+            ('first page, all recipes', {}),
+        ):
+            self.measure(label, lambda: self.get(
+                URL, self.follower, **params))
@@ -0,0 +1,88 @@
+from django.db.models import Max, Min
+
+from api.benchmarks import (
+    BenchmarkCommand,
+    bulk_create_in_batches,
+    request_cycle,
+)
+from api.filters import RecipeFilter
+from recipes.models import Recipe, Tag
+from users.models import User
+
+URL = '/api/recipes/'
+TAGS = 10
+TAGS_PER_RECIPE = 3
+
+
+def join_page(queryset, slugs):
+    """The former filter: a join on the tags, de-duplicated."""
+    queryset = queryset.filter(tags__slug__in=slugs).distinct()
+    return queryset.count(), list(queryset.values_list('id', flat=True)[:6])
+
+
+def semi_join_page(queryset, slugs):
+    with request_cycle():
+        queryset = RecipeFilter({'tags': slugs}, queryset=queryset).qs
+        return queryset.count(), list(
+            queryset.values_list('id', flat=True)[:6])
+
+
+class Command(BenchmarkCommand):
+    help = 'Time the recipe list filtered by 1 to 10 tags.'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--recipes', type=int, default=200_000,
+            help=f'Recipes in the table, with {TAGS_PER_RECIPE} tags each.')
+
+    def populate(self, recipes, **options):
+        self.viewer = User.objects.create_user(
+            username='viewer', email='viewer@example.com')
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            recipes_count=recipes)
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'Benchmark {number}', slug=f'benchmark-{number}')
+            for number in range(TAGS)
+        )
+        self.slugs = [tag.slug for tag in tags]
+        tag_ids = list(Tag.objects.filter(
+            slug__in=self.slugs).order_by('slug').values_list('id', flat=True))
+        bulk_create_in_batches(Recipe, (
+            Recipe(
+                author=author,
+                name=f'Recipe {number}',
+                text='Mix and cook.',
+                cooking_time=20,
+                image='recipes/images/benchmark.png',
+            )
+            for number in range(recipes)
+        ))
+        bounds = Recipe.objects.aggregate(first=Min('id'), last=Max('id'))
+        RecipeTag = Recipe.tags.through
+        bulk_create_in_batches(RecipeTag, (
+            RecipeTag(
+                recipe_id=recipe_id,
+                tag_id=tag_ids[(recipe_id + offset * 3) % TAGS]
+            )
+            for recipe_id in range(bounds['first'], bounds['last'] + 1)
+            for offset in range(TAGS_PER_RECIPE)
+        ))
+
+    def run_cases(self, **options):
+        queryset = Recipe.objects.all()
+        for count in range(1, TAGS + 1):
+            slugs = self.slugs[:count]
+            joined = join_page(queryset, slugs)
+            if semi_join_page(queryset, slugs) != joined:
+                self.stderr.write(f'{count} tags: the results differ.')
+            self.measure(
+                f'{count:2} tags: API request',
+                lambda: self.get(URL, self.viewer, tags=slugs))
+            self.measure(
+                f'{count:2} tags: semi-join, count + page',
+                lambda: semi_join_page(queryset, slugs))
+            self.measure(
+                f'{count:2} tags: join + DISTINCT, count + page',
+                lambda: join_page(queryset, slugs))
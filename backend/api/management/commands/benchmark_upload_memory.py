@@ -0,0 +1,124 @@
+import base64
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management.base import BaseCommand, CommandError
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+from rest_framework.request import Request
+
+from api.benchmarks import get_request_host
+from api.serializers import AvatarSerializer
+from api.views import AvatarUpdateView
+
+MODES = {
+    'base64': 'application/json',
+    'multipart': MULTIPART_CONTENT,
+}
+
+
+def make_png(size):
+    """Return PNG bytes of about ``size`` bytes; noise does not compress."""
+    side = max(1, int(math.sqrt(size / 3)))
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(
+        buffer, 'PNG', compress_level=0)
+    return buffer.getvalue()
+
+
+def encode_body(mode, image):
+    if mode == 'base64':
+        return json.dumps({
+            'avatar': ('data:image/png;base64,'
+                       + base64.b64encode(image).decode())
+        }).encode()
+    return encode_multipart(BOUNDARY, {
+        'avatar': SimpleUploadedFile('avatar.png', image, 'image/png')})
+
+
+def read_status(field):
+    """Return a memory field of /proc/self/status in bytes (Linux)."""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+    raise CommandError(f'{field} is not reported by this system.')
+
+
+def reset_peak_rss():
+    """Lower the peak RSS to the current RSS, forgetting start-up peaks."""
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+
+
+class Command(BaseCommand):
+    help = ('Compare the peak memory of parsing and validating an avatar '
+            'upload sent as base64 JSON and as multipart.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=settings.IMAGE_UPLOAD_MAX_SIZE // 2,
+            help='Approximate image size in bytes.')
+        parser.add_argument('--child', choices=MODES, help=(
+            'Internal: parse the request body in --body and print the '
+            'memory it took.'))
+        parser.add_argument('--body', help='Internal: request body file.')
+
+    def handle(self, *args, **options):
+        if options['child']:
+            self.parse(options['child'], options['body'])
+            return
+        image = make_png(options['size'])
+        self.stdout.write(f'Image of {len(image) / 2 ** 20:.1f} MiB.')
+        for mode in MODES:
+            with tempfile.NamedTemporaryFile(suffix='.body') as body:
+                body.write(encode_body(mode, image))
+                body.flush()
+                # A fresh process per mode, as the peak RSS of a process
+                # never goes down.
+                result = subprocess.run(
+                    [sys.executable, '-m', 'django', 'benchmark_upload_memory',
+                     '--child', mode, '--body', body.name],
+                    cwd=settings.BASE_DIR, capture_output=True, text=True
+                )
+                if result.returncode:
+                    raise CommandError(result.stderr)
+                peak = json.loads(result.stdout)
+                body_size = os.path.getsize(body.name)
+                self.stdout.write(
+                    f'{mode:<10} body {body_size / 2 ** 20:6.1f} MiB, '
+                    f'peak RSS +{peak["parsing"] / 2 ** 20:6.1f} MiB '
+                    f'over {peak["baseline"] / 2 ** 20:6.1f} MiB'
+                )
+
+    def parse(self, mode, path):
+        """Parse and validate the body like ``AvatarUpdateView.put``."""
+        reset_peak_rss()
+        baseline = read_status('VmRSS')
+        with open(path, 'rb') as body:
+            request = Request(WSGIRequest({
+                'REQUEST_METHOD': 'PUT',
+                'PATH_INFO': '/api/users/me/avatar/',
+                'SERVER_NAME': get_request_host(),
+                'SERVER_PORT': '80',
+                'wsgi.url_scheme': 'http',
+                'wsgi.input': body,
+                'CONTENT_TYPE': MODES[mode],
+                'CONTENT_LENGTH': str(os.path.getsize(path)),
+            }), parsers=[
+                parser() for parser in AvatarUpdateView.parser_classes])
+            serializer = AvatarSerializer(data=request.data, partial=True)
+            if not serializer.is_valid():
+                raise CommandError(serializer.errors)
+        self.stdout.write(json.dumps({
+            'baseline': baseline,
+            'parsing': read_status('VmHWM') - baseline,
+        }))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import (
+    HIT,
+    MISS,
+    get_response_cache,
+    get_stats,
+    is_process_local,
+    reset_stats,
+)
+
+
+class Command(BaseCommand):
+    help = 'Show hit and miss counts of the anonymous recipe response cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Zero the counters after printing them.')
+
+    def handle(self, *args, **options):
+        if is_process_local(get_response_cache()):
+            self.stderr.write(self.style.WARNING(
+                'The response cache lives in the memory of each process, '
+                'so these counters only cover this command. Set REDIS_URL '
+                'to share them, or read /api/cache/stats/ as staff.'
+            ))
+        for kind, counts in get_stats().items():
+            total = counts[HIT] + counts[MISS]
+            ratio = counts[HIT] / total if total else 0
+            self.stdout.write(
+                f'{kind}: {counts[HIT]} hits, {counts[MISS]} misses '
+                f'({ratio:.1%} hit rate)'
+            )
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
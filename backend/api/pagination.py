@@ -0,0 +1,134 @@
+import hashlib
+import json
+from functools import cached_property
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+KEYSET_MODE = 'keyset'
+EXACT_COUNT = 'exact'
+ESTIMATED_COUNT = 'estimate'
+COUNT_CACHE_PREFIX = 'pagination:count:'
+
+
+def get_planner_estimate(queryset):
+    """Return the PostgreSQL planner's row estimate for the queryset."""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return plan[0]['Plan']['Plan Rows']
+
+
+def get_cached_count(queryset):
+    """Return an exact count cached per query signature for a short TTL."""
+    sql, params = queryset.order_by().query.sql_with_params()
+    key = COUNT_CACHE_PREFIX + hashlib.sha256(
+        f'{sql}{params!r}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TTL)
+    return count
+
+
+def get_estimated_count(queryset):
+    """Count cheaply when an approximate total is good enough.
+
+    Large results use the planner's estimate; results estimated below
+    ``PAGINATION_COUNT_ESTIMATE_THRESHOLD`` rows are counted exactly.
+    Without a planner estimate the exact count is cached per query.
+    """
+    estimate = get_planner_estimate(queryset)
+    if estimate is None:
+        return get_cached_count(queryset)
+    if estimate < settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+class EstimatedCountPaginator(Paginator):
+
+    @cached_property
+    def count(self):
+        return get_estimated_count(self.object_list)
+
+
+def get_count_mode(request):
+    return request.query_params.get('count')
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination keyed on the model's default ordering.
+
+    Pages are fetched with ``WHERE id < last_id`` instead of an
+    ``OFFSET`` scan, and no ``COUNT(*)`` is run unless the client asks
+    for it with ``count=exact`` or ``count=estimate``.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(queryset.model._meta.ordering) or ('-pk',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        count_mode = get_count_mode(request)
+        if count_mode == EXACT_COUNT:
+            self.count = queryset.count()
+        elif count_mode == ESTIMATED_COUNT:
+            self.count = get_estimated_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = {}
+        if self.count is not None:
+            response['count'] = self.count
+        response.update({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+        return Response(response)
+
+
+class PageNumberOrKeysetPagination(PageNumberPagination):
+    """Page-number pagination with a per-request keyset mode.
+
+    Requests with ``pagination=keyset`` or a ``cursor`` over the model's
+    default ordering are handed to ``KeysetPagination``; everything else
+    keeps the page-number responses the frontend relies on, with
+    ``count=estimate`` trading the exact total for a cheap approximate
+    one.
+    """
+
+    mode_query_param = 'pagination'
+    keyset_pagination_class = KeysetPagination
+
+    def use_keyset(self, request, queryset):
+        # Keysets follow the model ordering; ranked or re-sorted results
+        # such as a search keep their own order and are paginated by page
+        # number.
+        order_by = tuple(queryset.query.order_by)
+        if order_by and order_by != tuple(queryset.model._meta.ordering):
+            return False
+        return (
+            request.query_params.get(self.mode_query_param) == KEYSET_MODE
+            or self.keyset_pagination_class.cursor_query_param
+            in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request, queryset):
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        if get_count_mode(request) == ESTIMATED_COUNT:
+            self.django_paginator_class = EstimatedCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,9 +1,26 @@
+import json
+
+import filetype
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
 from django.core.validators import RegexValidator
-from drf_extra_fields.fields import Base64ImageField
+from django.db import IntegrityError, transaction
+from django.db.models import Manager, prefetch_related_objects
+from drf_extra_fields.fields import Base64FieldMixin, Base64ImageField
 from rest_framework import serializers
-
-from api.utils import get_is_favorited, get_is_in_shopping_cart
+from rest_framework.utils import html
+
+from api.cache import get_recipe_fragments
+from api.utils import (
+    get_is_favorited,
+    get_is_in_shopping_cart,
+    get_subscribed_author_ids,
+    load_tag_ids,
+)
+from recipes.catalog import get_catalog
+from recipes.images import FORMATS as IMAGE_FORMATS
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -12,15 +29,141 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
+from recipes.services import (
+    update_ingredient_arrays,
+    update_recipe_in_shopping_lists,
+)
+from users.constants import ImageStatus
 from users.models import Subscription, User
 
 
+class ImageVariantsField(serializers.Field):
+    """Resized copies of an image as ``{size: {width, height, format: url}}``.
+
+    URLs are relative, so cached recipe fragments do not depend on the
+    host a request came in on.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return {
+            size_name: {
+                key: (default_storage.url(item) if key in IMAGE_FORMATS
+                      else item)
+                for key, item in variant.items()
+            }
+            for size_name, variant in (value or {}).get('sizes', {}).items()
+        }
+
+
+class ReadyImageMixin:
+    """Represent an image as ``None`` until a job has verified the file.
+
+    Uploads are only sniffed by their magic bytes, so they are not
+    served before the job marks them ready in ``status_field``.
+    """
+
+    status_field = None
+
+    def get_attribute(self, instance):
+        if self.status_field and (
+            getattr(instance, self.status_field) != ImageStatus.READY
+        ):
+            return None
+        return super().get_attribute(instance)
+
+
+class ProcessedImageField(ReadyImageMixin, serializers.ImageField):
+    """Read-only image URL of a verified image."""
+
+    def __init__(self, status_field, **kwargs):
+        kwargs['read_only'] = True
+        self.status_field = status_field
+        super().__init__(**kwargs)
+
+
+def get_ready_image_url(field_file, status):
+    """Return the relative URL of a verified image, or None."""
+    if field_file and status == ImageStatus.READY:
+        return field_file.url
+    return None
+
+
+class DeferredImageField(
+    ReadyImageMixin, Base64FieldMixin, serializers.FileField
+):
+    """Image sent as base64 or as a multipart file, verified by a job.
+
+    The type is sniffed from the file's magic bytes only; decoding and
+    re-encoding with Pillow happens outside of the request. With a
+    ``status_field`` the response shows the image once it is ready.
+    """
+
+    def __init__(self, status_field=None, **kwargs):
+        self.status_field = status_field
+        super().__init__(**kwargs)
+
+    ALLOWED_TYPES = Base64ImageField.ALLOWED_TYPES
+    INVALID_FILE_MESSAGE = Base64ImageField.INVALID_FILE_MESSAGE
+    INVALID_TYPE_MESSAGE = Base64ImageField.INVALID_TYPE_MESSAGE
+    TOO_LARGE_MESSAGE = 'The image must not be larger than {max_size} bytes.'
+
+    def check_size(self, size):
+        if size > settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(self.TOO_LARGE_MESSAGE.format(
+                max_size=settings.IMAGE_UPLOAD_MAX_SIZE))
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            # Checked before decoding, which would double the memory use.
+            self.check_size(len(data) * 3 // 4)
+            return super().to_internal_value(data)
+        if not isinstance(data, UploadedFile):
+            return super().to_internal_value(data)
+        self.check_size(data.size)
+        extension = self.get_file_extension(data.name, data)
+        if extension not in self.ALLOWED_TYPES:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        data.name = f'{self.get_file_name(data)}.{extension}'
+        return serializers.FileField.to_internal_value(self, data)
+
+    def get_file_extension(self, filename, decoded_file):
+        extension = filetype.guess_extension(decoded_file)
+        return 'jpg' if extension == 'jpeg' else extension
+
+
+class JSONListField(serializers.ListField):
+    """List field that multipart forms may send as a JSON string."""
+
+    def get_value(self, dictionary):
+        value = super().get_value(dictionary)
+        if html.is_html_input(dictionary) and isinstance(value, list) and (
+            len(value) == 1 and isinstance(value[0], str)
+        ):
+            return value[0]
+        return value
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                self.fail('not_a_list', input_type=type(data).__name__)
+        return super().to_internal_value(data)
+
+
 class RecipeShortSerializer(serializers.ModelSerializer):
     """serializer for showing minimum rcipe in info subscriptions."""
 
+    image = ProcessedImageField('image_status')
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -74,14 +217,15 @@ class UserSerializer(serializers.ModelSerializer):
     """Serializer for displaying user data, with subscription status."""
 
     is_subscribed = serializers.SerializerMethodField()
-    avatar = serializers.ImageField(read_only=True)
+    avatar = ProcessedImageField('avatar_status')
+    avatar_variants = ImageVariantsField()
 
     class Meta:
         model = User
         fields = (
             'email', 'id', 'username',
             'first_name', 'last_name',
-            'avatar', 'is_subscribed'
+            'avatar', 'avatar_variants', 'is_subscribed'
         )
 
     def validate_username(self, value):
@@ -90,18 +234,15 @@ class UserSerializer(serializers.ModelSerializer):
         return value
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return Subscription.objects.filter(user=request.user,
-                                           author=obj).exists()
+        return obj.id in get_subscribed_author_ids(self.context)
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
     """Serializer for showing the list of authors a user is subscribed to."""
 
     is_subscribed = serializers.SerializerMethodField()
-    avatar = serializers.ImageField(read_only=True)
+    avatar = ProcessedImageField('avatar_status')
+    avatar_variants = ImageVariantsField()
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.IntegerField(read_only=True)
 
@@ -109,25 +250,22 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         model = User
         fields = (
             'email', 'id', 'username', 'first_name', 'last_name',
-            'is_subscribed', 'avatar', 'recipes', 'recipes_count'
+            'is_subscribed', 'avatar', 'avatar_variants',
+            'recipes', 'recipes_count'
         )
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        return Subscription.objects.filter(
-            user=request.user, author=obj
-        ).exists()
+        return obj.id in get_subscribed_author_ids(self.context)
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.query_params.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit and limit.isdigit():
-            recipes = recipes[:int(limit)]
+        recipes = getattr(obj, 'recipe_previews', None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            limit = self.context.get('recipes_limit')
+            if limit is not None:
+                recipes = recipes[:limit]
         return RecipeShortSerializer(
-            recipes, many=True, context={'request': request}).data
+            recipes, many=True, context=self.context).data
 
 
 class SubscriptionCreateSerializer(serializers.ModelSerializer):
@@ -171,12 +309,35 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+    """Serialize a page of recipes from cached fragments.
+
+    Only recipes without a fresh fragment are rendered, with their
+    ingredient amounts and tag IDs loaded in one query each.
+    """
+
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        fragments = get_recipe_fragments(recipes, self.child.render_fragments)
+        return [
+            self.child.overlay_viewer_state(fragments[recipe.id], recipe)
+            for recipe in recipes
+        ]
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
-    """Serializer for reading the recipes."""
+    """Serializer for reading the recipes.
+
+    Tag and ingredient names are looked up in the in-process catalog,
+    so only the recipe's own tag IDs and ingredient amounts are queried.
+    Everything but the viewer's flags is cached per recipe as a fragment
+    (see ``api.cache.get_recipe_fragments``).
+    """
 
     author = UserSerializer(read_only=True)
-    tags = TagSerializer(many=True, read_only=True)
+    tags = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField()
     ingredients = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
@@ -186,31 +347,87 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time'
+            'name', 'image', 'image_variants', 'image_status',
+            'text', 'cooking_time'
         )
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        if self.context.get('skip_fragment_cache'):
+            # A recipe that was just written: the invalidation of its
+            # fragment may still be waiting for the commit.
+            fragments = self.render_fragments([instance])
+        else:
+            fragments = get_recipe_fragments(
+                [instance], self.render_fragments)
+        return self.overlay_viewer_state(fragments[instance.id], instance)
+
+    def render_fragments(self, recipes):
+        prefetch_related_objects(recipes, 'recipe_ingredients')
+        load_tag_ids(recipes)
+        fragments = {}
+        for recipe in recipes:
+            fragment = super().to_representation(recipe)
+            # Fragments are shared by every host the site answers on, so
+            # the avatar is stored relative and made absolute per request.
+            fragment['author']['avatar'] = get_ready_image_url(
+                recipe.author.avatar, recipe.author.avatar_status)
+            fragments[recipe.id] = fragment
+        return fragments
+
+    def overlay_viewer_state(self, fragment, recipe):
+        """Fill in the fields that depend on the requesting user."""
+        avatar = fragment['author']['avatar']
+        request = self.context.get('request')
+        if avatar and request is not None:
+            avatar = request.build_absolute_uri(avatar)
+        return {
+            **fragment,
+            'author': {
+                **fragment['author'],
+                'avatar': avatar,
+                'is_subscribed': recipe.author_id in get_subscribed_author_ids(
+                    self.context)
+            },
+            'is_favorited': self.get_is_favorited(recipe),
+            'is_in_shopping_cart': self.get_is_in_shopping_cart(recipe),
+        }
+
+    def get_tags(self, obj):
+        load_tag_ids([obj])
+        return [
+            tag._asdict() for tag in get_catalog().get_tags(obj.tag_ids)
+        ]
 
     def get_image(self, obj):
-        if obj.image:
-            return obj.image.url
-        return ''
+        return get_ready_image_url(obj.image, obj.image_status) or ''
 
     def get_ingredients(self, obj):
+        recipe_ingredients = [
+            recipe_ingredient
+            for recipe_ingredient in obj.recipe_ingredients.all()
+            if recipe_ingredient.ingredient_id is not None
+        ]
+        ingredients = get_catalog().get_ingredients(
+            [item.ingredient_id for item in recipe_ingredients])
         return [
             {
-                'id': recipe.ingredient.id,
-                'name': recipe.ingredient.name,
-                'measurement_unit': recipe.ingredient.measurement_unit,
-                'amount': recipe.amount
+                **ingredients[item.ingredient_id]._asdict(),
+                'amount': item.amount
             }
-            for recipe in obj.recipe_ingredients.all()
-            if recipe.ingredient is not None
+            for item in recipe_ingredients
+            if item.ingredient_id in ingredients
         ]
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return get_is_favorited(obj, request.user if request else None)
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return get_is_in_shopping_cart(obj, request.user if request else None)
 
@@ -218,8 +435,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
 class RecipeWriteSerializer(serializers.ModelSerializer):
     """Serializer for creating/editing recipes (POST, PUT, PATCH)."""
 
-    image = Base64ImageField()
-    ingredients = serializers.ListField(
+    image = DeferredImageField()
+    ingredients = JSONListField(
         child=serializers.DictField(), write_only=True,
         required=True
     )
@@ -247,8 +464,11 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             ingredient_id = item.get('id')
             amount = item.get('amount')
 
-            if not Ingredient.objects.filter(id=ingredient_id).exists():
+            try:
+                ingredient_id = int(ingredient_id)
+            except (TypeError, ValueError):
                 invalid_ids.append(ingredient_id)
+                continue
 
             if ingredient_id in seen:
                 raise serializers.ValidationError(
@@ -264,8 +484,15 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
                     f'Amount for ingredient {ingredient_id} must be positive.'
                 )
 
+            item['id'] = ingredient_id
             item['amount'] = amount
 
+        existing_ids = set(Ingredient.objects.filter(
+            id__in=seen).values_list('id', flat=True))
+        invalid_ids.extend(
+            ingredient_id for ingredient_id in seen
+            if ingredient_id not in existing_ids
+        )
         if invalid_ids:
             raise serializers.ValidationError(
                 f'Invalid ingredient IDs: {invalid_ids}'
@@ -283,6 +510,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -290,6 +518,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         self.set_ingredients_and_tags(recipe, ingredients, tags)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -299,16 +528,41 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         return instance
 
     def set_ingredients_and_tags(self, recipe, ingredients, tags):
+        """Write only the difference to the recipe's current relations."""
         recipe.tags.set(tags)
-        recipe.recipe_ingredients.all().delete()
+        existing = {
+            item.ingredient_id: item
+            for item in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        old_amounts = {
+            ingredient_id: item.amount
+            for ingredient_id, item in existing.items()
+            if ingredient_id is not None
+        }
+        new_amounts = {
+            ingredient_data['id']: ingredient_data['amount']
+            for ingredient_data in ingredients
+        }
+        to_update = []
+        for ingredient_id, amount in new_amounts.items():
+            item = existing.get(ingredient_id)
+            if item is not None and item.amount != amount:
+                item.amount = amount
+                to_update.append(item)
+
+        if existing.keys() - new_amounts.keys():
+            RecipeIngredient.objects.filter(recipe=recipe).exclude(
+                ingredient_id__in=new_amounts).delete()
+        RecipeIngredient.objects.bulk_update(to_update, ['amount'])
         RecipeIngredient.objects.bulk_create([
             RecipeIngredient(
-                recipe=recipe,
-                ingredient=Ingredient.objects.get(id=ingredient_data['id']),
-                amount=ingredient_data['amount']
-            )
-            for ingredient_data in ingredients
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in new_amounts.items()
+            if ingredient_id not in existing
         ])
+        update_recipe_in_shopping_lists(recipe.id, old_amounts, new_amounts)
+        if old_amounts.keys() != new_amounts.keys():
+            update_ingredient_arrays([recipe.id])
 
     def validate_image(self, value):
         if not value:
@@ -361,7 +615,11 @@ class FavoriteSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        return Favorite.objects.create(**validated_data)
+        try:
+            with transaction.atomic():
+                return Favorite.objects.create(**validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError('Already favorited.')
 
 
 class ShoppingCartSerializer(serializers.ModelSerializer):
@@ -383,7 +641,13 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        return ShoppingCart.objects.create(**validated_data)
+        # The counters and the shopping list follow the row in the same
+        # transaction; a concurrent duplicate only fails the constraint.
+        try:
+            with transaction.atomic():
+                return ShoppingCart.objects.create(**validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError('Already in shopping cart.')
 
 
 class IngredientInRecipeSerializer(serializers.ModelSerializer):
@@ -403,8 +667,8 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
 
 
 class AvatarSerializer(serializers.ModelSerializer):
-    avatar = Base64ImageField()
+    avatar = DeferredImageField('avatar_status')
 
     class Meta:
         model = User
-        fields = ('avatar',)
+        fields = ('avatar', 'avatar_status')
@@ -0,0 +1,124 @@
+import csv
+import io
+import os
+
+from django.conf import settings
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.models import ShoppingListItem
+
+ITERATOR_CHUNK_SIZE = 2000
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_FALLBACK_FONT = 'Helvetica'
+PDF_FONT_SIZE = 11
+PDF_TITLE_FONT_SIZE = 14
+PDF_LINE_HEIGHT = 16
+PDF_MARGIN = 50
+
+
+def get_shopping_list(user):
+    """Return the stored per-ingredient totals of the user's cart.
+
+    Totals are kept up to date by ``recipes.services`` whenever the cart
+    or a recipe in it changes, so this is a plain indexed read.
+    """
+    return (
+        ShoppingListItem.objects
+        .filter(user=user)
+        .values(
+            'total_amount',
+            name=F('ingredient__name'),
+            unit=F('ingredient__measurement_unit')
+        )
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+    )
+
+
+def format_item(number, item):
+    return (
+        f'{number}. {item["name"]} '
+        f'({item["unit"]}) - '
+        f'{item["total_amount"]}'
+    )
+
+
+def render_text(items):
+    yield 'Shopping List:\n\n'
+    for number, item in enumerate(items, 1):
+        yield format_item(number, item) + '\n'
+
+
+class _Echo:
+    """File-like object that hands back whatever csv.writer writes."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(items):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for item in items:
+        yield writer.writerow(
+            (item['name'], item['unit'], item['total_amount']))
+
+
+def get_pdf_font():
+    """Register the configured TTF font once, Helvetica if it is missing."""
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    font_path = settings.SHOPPING_LIST_PDF_FONT
+    if not font_path or not os.path.exists(font_path):
+        return PDF_FALLBACK_FONT
+    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+    return PDF_FONT_NAME
+
+
+def render_pdf(items):
+    """Yield the shopping list as a PDF document.
+
+    The PDF cross-reference table needs the whole document, so it is
+    built in memory; its size is bounded by the number of distinct
+    ingredients, not by the number of recipes in the cart.
+    """
+    buffer = io.BytesIO()
+    font = get_pdf_font()
+    width, height = A4
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    y = height - PDF_MARGIN
+    pdf.setFont(font, PDF_TITLE_FONT_SIZE)
+    pdf.drawString(PDF_MARGIN, y, 'Shopping List:')
+    y -= 2 * PDF_LINE_HEIGHT
+    pdf.setFont(font, PDF_FONT_SIZE)
+    for number, item in enumerate(items, 1):
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(font, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        pdf.drawString(PDF_MARGIN, y, format_item(number, item))
+        y -= PDF_LINE_HEIGHT
+    pdf.save()
+    yield buffer.getvalue()
+
+
+FORMATS = {
+    'txt': (render_text, 'text/plain'),
+    'csv': (render_csv, 'text/csv'),
+    'pdf': (render_pdf, 'application/pdf'),
+}
+
+
+def shopping_list_response(user, file_format='txt'):
+    """Stream the user's shopping list in one of the supported formats."""
+    render, content_type = FORMATS[file_format]
+    items = get_shopping_list(user).iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    response = StreamingHttpResponse(
+        render(items), content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="shopping_list.{file_format}"')
+    return response
@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.cache import invalidate_author_on_commit, invalidate_recipes_on_commit
+from recipes.image_jobs import image_processed
+from recipes.models import Recipe
+from users.models import User
+
+# User fields that show up in the ``author`` of a recipe payload.
+AUTHOR_FIELDS = frozenset(
+    ('email', 'username', 'first_name', 'last_name', 'avatar'))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_cached_recipe(sender, instance, **kwargs):
+    # Ingredient and tag changes made through the API or the admin come
+    # with a save of the recipe, and invalidation waits for the commit.
+    invalidate_recipes_on_commit([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_cached_recipe_tags(sender, instance, action, reverse,
+                                  pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_recipes_on_commit([instance.pk])
+    elif action == 'pre_clear':
+        invalidate_recipes_on_commit(
+            instance.recipes.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_recipes_on_commit(pk_set)
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_author(sender, instance, created, update_fields,
+                             **kwargs):
+    if created or (update_fields and AUTHOR_FIELDS.isdisjoint(update_fields)):
+        return
+    invalidate_author_on_commit(instance.pk)
+
+
+@receiver(image_processed, sender=Recipe)
+def invalidate_processed_recipe_image(sender, pk, **kwargs):
+    invalidate_recipes_on_commit([pk])
+
+
+@receiver(image_processed, sender=User)
+def invalidate_processed_avatar(sender, pk, **kwargs):
+    invalidate_author_on_commit(pk)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    # Logging out through djoser deletes the user's token. The key is
+    # the primary key, which the delete resets on the instance.
+    key = instance.key
+    transaction.on_commit(lambda: token_cache.invalidate_key(key))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_tokens(sender, instance, **kwargs):
+    # Covers password changes, deactivation and profile edits.
+    user_id = instance.pk
+    transaction.on_commit(lambda: token_cache.invalidate_user(user_id))
+
+
+@receiver(image_processed, sender=User)
+def forget_processed_avatar_tokens(sender, pk, **kwargs):
+    transaction.on_commit(lambda: token_cache.invalidate_user(pk))
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'The uploaded file is too large.'
+    default_code = 'upload_too_large'
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """Reject uploads above ``IMAGE_UPLOAD_MAX_SIZE`` while they stream.
+
+    Placed before the handler that stores the file, it counts the chunks
+    it passes on and stops the upload as soon as the limit is crossed; a
+    request whose declared length is already too large is refused before
+    anything is read.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        limit = (settings.IMAGE_UPLOAD_MAX_SIZE
+                 + settings.DATA_UPLOAD_MAX_MEMORY_SIZE)
+        if content_length and content_length > limit:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise UploadTooLarge()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
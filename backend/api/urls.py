@@ -5,6 +5,7 @@ from api.views import (
     AvatarUpdateView,
     IngredientViewSet,
     RecipeViewSet,
+    ResponseCacheStatsView,
     SetPasswordView,
     TagViewSet,
     UserViewSet,
@@ -21,6 +22,8 @@ urlpatterns = [
          name="set_password"),
     path("users/me/avatar/", AvatarUpdateView.as_view(),
          name="users-avatar"),
+    path("cache/stats/", ResponseCacheStatsView.as_view(),
+         name="cache-stats"),
     path("", include(router.urls)),
     path("auth/", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
@@ -1,3 +1,17 @@
+import re
+from collections import defaultdict
+
+from django.db.models import Exists, OuterRef, Value
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
+
+
 def get_is_favorited(recipe, user):
     """Check if the recipe is favorited by the current user."""
     if user.is_anonymous:
@@ -10,3 +24,90 @@ def get_is_in_shopping_cart(recipe, user):
     if user.is_anonymous:
         return False
     return recipe.in_shopping_carts.filter(user=user).exists()
+
+
+def favorited_by(user):
+    """``EXISTS`` condition: the outer recipe is in the user's favorites."""
+    return Exists(Favorite.objects.filter(user=user, recipe=OuterRef('pk')))
+
+
+def in_shopping_cart_of(user):
+    """``EXISTS`` condition: the outer recipe is in the user's cart."""
+    return Exists(ShoppingCart.objects.filter(
+        user=user, recipe=OuterRef('pk')))
+
+
+def annotate_viewer_state(queryset, user):
+    """Annotate recipes with the user's favorite and shopping cart flags.
+
+    Both flags are resolved as ``EXISTS`` subqueries of the page query,
+    so serializing a page costs no extra round trips per recipe.
+    """
+    if user.is_anonymous:
+        return queryset.annotate(
+            is_favorited=Value(False),
+            is_in_shopping_cart=Value(False)
+        )
+    return queryset.annotate(
+        is_favorited=favorited_by(user),
+        is_in_shopping_cart=in_shopping_cart_of(user)
+    )
+
+
+def get_subscribed_author_ids(context):
+    """Return IDs of the authors followed by the requesting user.
+
+    The set is loaded once and kept in the serializer context, so all
+    user payloads of a response (nested recipe authors included) share
+    a single query.
+    """
+    request = context.get('request')
+    if request is None or request.user.is_anonymous:
+        return frozenset()
+    if 'subscribed_author_ids' not in context:
+        context['subscribed_author_ids'] = frozenset(
+            Subscription.objects.filter(
+                user=request.user
+            ).values_list('author_id', flat=True)
+        )
+    return context['subscribed_author_ids']
+
+
+def load_tag_ids(recipes):
+    """Attach ``tag_ids`` to the recipes with one through-table query.
+
+    Tag names come from the catalog, so the ``recipes_tag`` table does
+    not need to be joined.
+    """
+    recipes = [recipe for recipe in recipes if not hasattr(recipe, 'tag_ids')]
+    if not recipes:
+        return
+    tag_ids = defaultdict(set)
+    for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+        recipe_id__in=[recipe.id for recipe in recipes]
+    ).values_list('recipe_id', 'tag_id'):
+        tag_ids[recipe_id].add(tag_id)
+    for recipe in recipes:
+        recipe.tag_ids = tag_ids[recipe.id]
+
+
+def catalog_payload_response(request, payload):
+    """Answer with a pre-rendered catalog payload.
+
+    Clients that accept gzip get the pre-compressed body, and a matching
+    ``If-None-Match`` is answered with 304 Not Modified.
+    """
+    if ACCEPTS_GZIP_RE.search(request.headers.get('Accept-Encoding', '')):
+        body, etag = payload.gzipped_body, payload.gzipped_etag
+    else:
+        body, etag = payload.body, payload.etag
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+        if body is payload.gzipped_body:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
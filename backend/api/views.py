@@ -1,15 +1,27 @@
-from django.db.models import Count, F, Sum
-from django.http import HttpResponse
+from django.db.models import Prefetch
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.serializers import SetPasswordSerializer
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from api.cache import (
+    DETAIL,
+    LIST,
+    cached_response,
+    get_detail_key,
+    get_list_key,
+    get_response_cache,
+    get_stats,
+    is_process_local,
+)
 from api.filters import IngredientFilter, RecipeFilter
+from api.pagination import PageNumberOrKeysetPagination
 from api.permissions import IsAuthorOrReadOnly
 from api.serializers import (
     AvatarSerializer,
@@ -24,15 +36,22 @@ from api.serializers import (
     UserCreateSerializer,
     UserSerializer,
 )
+from api.shopping_list import FORMATS as SHOPPING_LIST_FORMATS
+from api.shopping_list import shopping_list_response
+from api.utils import annotate_viewer_state, catalog_payload_response
+from recipes.catalog import get_catalog
 from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 from users.models import Subscription, User
 
+INGREDIENTS_MAX_LIMIT = 100
+
 
 class UserViewSet(viewsets.ModelViewSet):
     """Handle the user views and subscriptions."""
 
     queryset = User.objects.all()
     permission_classes = [permissions.AllowAny]
+    pagination_class = PageNumberOrKeysetPagination
     lookup_field = 'id'
 
     def get_serializer_class(self):
@@ -78,10 +97,14 @@ class UserViewSet(viewsets.ModelViewSet):
         if recipes_limit and recipes_limit.isdigit():
             context['recipes_limit'] = int(recipes_limit)
 
+        previews = Recipe.objects.all()
+        if 'recipes_limit' in context:
+            previews = previews[:context['recipes_limit']]
+
         authors = User.objects.filter(
             followers__user=user
-        ).annotate(
-            recipes_count=Count('recipes')
+        ).order_by('id').prefetch_related(
+            Prefetch('recipes', queryset=previews, to_attr='recipe_previews')
         )
 
         page = self.paginate_queryset(authors)
@@ -99,20 +122,44 @@ class UserViewSet(viewsets.ModelViewSet):
 class RecipeViewSet(viewsets.ModelViewSet):
     """Main logic for recipes: CRUD, favorites, cart, download."""
 
-    queryset = Recipe.objects.select_related('author').prefetch_related(
-        'tags', 'recipe_ingredients__ingredient'
-    )
+    # Ingredients are prefetched by the serializer, only for recipes
+    # without a cached fragment.
+    queryset = Recipe.objects.select_related('author').defer(
+        'search_vector')
     permission_classes = [IsAuthorOrReadOnly]
+    # Images come as base64 in JSON or as multipart files.
+    parser_classes = [JSONParser, MultiPartParser]
+    pagination_class = PageNumberOrKeysetPagination
     serializer_class = RecipeReadSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
     lookup_field = 'id'
 
+    def get_queryset(self):
+        return annotate_viewer_state(
+            super().get_queryset(), self.request.user)
+
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, LIST,
+            lambda cache: get_list_key(request, cache),
+            lambda: super(RecipeViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe_id = kwargs[self.lookup_field]
+        return cached_response(
+            request, DETAIL,
+            lambda cache: get_detail_key(request, cache, recipe_id),
+            lambda: super(RecipeViewSet, self).retrieve(
+                request, *args, **kwargs)
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -122,7 +169,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         self.perform_create(serializer)
 
         read_serializer = RecipeReadSerializer(
-            serializer.instance, context={'request': request})
+            serializer.instance,
+            context={'request': request, 'skip_fragment_cache': True}
+        )
         return Response(read_serializer.data, status=status.HTTP_201_CREATED)
 
     def update(self, request, *args, **kwargs):
@@ -134,8 +183,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
 
+        if getattr(instance, '_prefetched_objects_cache', None):
+            # The ingredients were changed in place, drop the stale prefetch.
+            instance._prefetched_objects_cache = {}
+
         read_serializer = RecipeReadSerializer(
-            serializer.instance, context={'request': request})
+            serializer.instance,
+            context={'request': request, 'skip_fragment_cache': True}
+        )
         return Response(read_serializer.data)
 
     @action(detail=True, methods=['post', 'delete'],
@@ -195,32 +250,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'],
             permission_classes=[permissions.IsAuthenticated])
     def download_shopping_cart(self, request):
-        ingredients = (
-            ShoppingCart.objects
-            .filter(user=request.user)
-            .values(
-                name=F('recipe__ingredients__name'),
-                unit=F('recipe__ingredients__measurement_unit')
-            )
-            .annotate(total_amount=Sum('recipe__recipe_ingredients__amount'))
-            .order_by('name')
-        )
-
-        content = self._generate_shopping_list_content(ingredients)
-        response = HttpResponse(content, content_type='text/plain')
-        response[
-            'Content-Disposition'] = 'attachment; filename="shopping_list.txt"'
-        return response
-
-    def _generate_shopping_list_content(self, ingredients):
-        content = 'Shopping List:\n\n'
-        for i, item in enumerate(ingredients, 1):
-            content += (
-                f'{i}. {item["name"]} '
-                f'({item["unit"]}) - '
-                f'{item["total_amount"]}\n'
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in SHOPPING_LIST_FORMATS:
+            return Response(
+                {'errors': 'Unsupported file format. Choose one of: '
+                           f'{", ".join(SHOPPING_LIST_FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        return content
+        return shopping_list_response(request.user, file_format)
 
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, id=None):
@@ -230,7 +267,35 @@ class RecipeViewSet(viewsets.ModelViewSet):
         })
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class CatalogViewSetMixin:
+    """Serve list/retrieve from the in-process tag and ingredient catalog.
+
+    Subclasses define ``get_catalog_records`` and ``get_catalog_record``.
+    """
+
+    def get_catalog_payload(self, catalog):
+        """Return the pre-rendered payload, or None for filtered lists."""
+        return None
+
+    def list(self, request, *args, **kwargs):
+        catalog = get_catalog()
+        payload = self.get_catalog_payload(catalog)
+        if payload is not None:
+            return catalog_payload_response(request, payload)
+        records = self.get_catalog_records(catalog)
+        return Response([record._asdict() for record in records])
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        record = None
+        if pk.isdigit():
+            record = self.get_catalog_record(get_catalog(), int(pk))
+        if record is None:
+            raise Http404
+        return Response(record._asdict())
+
+
+class TagViewSet(CatalogViewSetMixin, viewsets.ReadOnlyModelViewSet):
     """Manage tags for recipes (list/retrieve only)."""
 
     queryset = Tag.objects.all()
@@ -239,9 +304,23 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     lookup_field = 'id'
 
+    def get_catalog_payload(self, catalog):
+        return catalog.tags_payload
+
+    def get_catalog_records(self, catalog):
+        return catalog.tags
+
+    def get_catalog_record(self, catalog, pk):
+        return catalog.tags_by_id.get(pk)
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
-    """Ingredient viewset with search."""
+
+class IngredientViewSet(CatalogViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    """Ingredient viewset with search.
+
+    ``?name=`` autocompletes from the database, where the ``lower(name)``
+    indexes serve it, prefix matches first; ``?limit=`` caps the number
+    of results. Everything else is answered from the catalog.
+    """
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -250,11 +329,36 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
 
+    def get_limit(self):
+        limit = self.request.query_params.get('limit')
+        if limit and limit.isdigit():
+            return min(int(limit), INGREDIENTS_MAX_LIMIT)
+        return None
+
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('name'):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            'id', 'name', 'measurement_unit')
+        return Response(list(queryset[:self.get_limit()]))
+
+    def get_catalog_payload(self, catalog):
+        if 'limit' in self.request.query_params:
+            return None
+        return catalog.ingredients_payload
+
+    def get_catalog_records(self, catalog):
+        return catalog.ingredients[:self.get_limit()]
+
+    def get_catalog_record(self, catalog, pk):
+        return catalog.ingredients_by_id.get(pk)
+
 
 class AvatarUpdateView(APIView):
     """Viewset for updating the Avatar."""
 
     permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser]
 
     def put(self, request):
         if 'avatar' not in request.data:
@@ -276,7 +380,10 @@ class AvatarUpdateView(APIView):
     def delete(self, request):
         user = request.user
         if user.avatar:
-            user.avatar.delete()
+            # The file may be shared with other uploads, so it is left to
+            # the orphan collection.
+            user.avatar = ''
+            user.save(update_fields=['avatar'])
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'error': 'No avatar to delete'},
@@ -301,3 +408,19 @@ class SetPasswordView(APIView):
         user.save()
 
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ResponseCacheStatsView(APIView):
+    """Hit and miss counts of the response cache, for staff.
+
+    With an in-memory cache the counts are those of the worker process
+    that answers the request.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'process_local': is_process_local(get_response_cache()),
+            'stats': get_stats(),
+        })
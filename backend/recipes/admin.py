@@ -2,12 +2,19 @@ from django.contrib import admin
 
 from recipes.models import (
     Favorite,
+    ImageJob,
     Ingredient,
     Recipe,
     RecipeIngredient,
     ShoppingCart,
+    ShoppingListItem,
     Tag,
 )
+from recipes.services import (
+    get_recipe_amounts,
+    update_ingredient_arrays,
+    update_recipe_in_shopping_lists,
+)
 
 
 @admin.register(Tag)
@@ -32,12 +39,24 @@ class RecipeIngredientInline(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'id', 'author', 'cooking_time')
+    list_display = (
+        'name', 'id', 'author', 'cooking_time',
+        'favorites_count', 'carts_count', 'trending_score'
+    )
     list_display_links = ('name', 'id', 'author')
     search_fields = ('name', 'author__username')
     list_filter = ('tags',)
     inlines = [RecipeIngredientInline]
 
+    def save_related(self, request, form, formsets, change):
+        recipe = form.instance
+        old_amounts = get_recipe_amounts(recipe.id) if change else {}
+        super().save_related(request, form, formsets, change)
+        new_amounts = get_recipe_amounts(recipe.id)
+        update_recipe_in_shopping_lists(recipe.id, old_amounts, new_amounts)
+        if old_amounts.keys() != new_amounts.keys():
+            update_ingredient_arrays([recipe.id])
+
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
         return queryset.select_related('author').prefetch_related(
@@ -48,7 +67,7 @@ class RecipeAdmin(admin.ModelAdmin):
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
-    list_display = ('user', 'recipe')
+    list_display = ('user', 'recipe', 'created_at')
 
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
@@ -64,7 +83,7 @@ class FavoriteAdmin(admin.ModelAdmin):
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ('user', 'recipe')
+    list_display = ('user', 'recipe', 'created_at')
 
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
@@ -76,3 +95,21 @@ class ShoppingCartAdmin(admin.ModelAdmin):
             'recipe__tags',
             'recipe__recipe_ingredients__ingredient',
         )
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'total_amount')
+    search_fields = ('user__username', 'ingredient__name')
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return queryset.select_related('user', 'ingredient')
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'kind', 'object_id', 'status', 'attempts', 'updated_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,179 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+from functools import cached_property
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from recipes.models import CatalogVersion, Ingredient, Tag
+
+CATALOG_VERSION_ID = 1
+
+TagRecord = namedtuple('TagRecord', ('id', 'name', 'slug'))
+IngredientRecord = namedtuple(
+    'IngredientRecord', ('id', 'name', 'measurement_unit'))
+CatalogPayload = namedtuple(
+    'CatalogPayload', ('body', 'etag', 'gzipped_body', 'gzipped_etag'))
+
+
+def build_payload(records):
+    """Pre-render records as compact JSON, gzipped and with ETags.
+
+    The ETags are derived from the content, so every process hands out
+    the same ones for the same catalog.
+    """
+    body = json.dumps(
+        [record._asdict() for record in records],
+        ensure_ascii=False,
+        separators=(',', ':')
+    ).encode()
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return CatalogPayload(
+        body, f'"{digest}"', gzip.compress(body, mtime=0), f'"{digest}-gz"')
+
+
+class Catalog:
+    """Immutable in-process snapshot of all tags and ingredients."""
+
+    def __init__(self, version, tags, ingredients):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.tags = tags
+        self.ingredients = ingredients
+        self.tags_by_id = {tag.id: tag for tag in tags}
+        self.ingredients_by_id = {
+            ingredient.id: ingredient for ingredient in ingredients}
+
+    @cached_property
+    def tags_payload(self):
+        return build_payload(self.tags)
+
+    @cached_property
+    def ingredients_payload(self):
+        return build_payload(self.ingredients)
+
+    def is_stale(self, version):
+        return (version != self.version
+                or time.monotonic() - self.built_at > settings.CATALOG_MAX_AGE)
+
+    def get_tags(self, ids):
+        """Return tag records for the IDs, ordered like ``Tag``."""
+        missing = set(ids) - self.tags_by_id.keys()
+        tags = [tag for tag in self.tags if tag.id in ids]
+        if missing:
+            tags.extend(
+                TagRecord(*row) for row in Tag.objects.filter(
+                    id__in=missing).values_list('id', 'name', 'slug')
+            )
+            tags.sort(key=lambda tag: tag.name)
+        return tags
+
+    def get_ingredients(self, ids):
+        """Return ``{id: record}``, loading ingredients newer than us."""
+        found = {
+            ingredient_id: self.ingredients_by_id[ingredient_id]
+            for ingredient_id in ids
+            if ingredient_id in self.ingredients_by_id
+        }
+        missing = set(ids) - found.keys()
+        if missing:
+            found.update(
+                (row[0], IngredientRecord(*row))
+                for row in Ingredient.objects.filter(
+                    id__in=missing
+                ).values_list('id', 'name', 'measurement_unit')
+            )
+        return found
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+# The catalog version read during the current request, if any.
+_request_state = Local()
+
+
+def start_request(**kwargs):
+    _request_state.catalog_version = None
+
+
+def finish_request(**kwargs):
+    try:
+        del _request_state.catalog_version
+    except AttributeError:
+        pass
+
+
+def read_catalog_version():
+    version = CatalogVersion.objects.filter(
+        pk=CATALOG_VERSION_ID).values_list('version', flat=True).first()
+    return version or 0
+
+
+def get_catalog_version():
+    """Return the catalog version, read from the database once per request.
+
+    Outside of requests, e.g. in management commands, it is read on
+    every call.
+    """
+    if not hasattr(_request_state, 'catalog_version'):
+        return read_catalog_version()
+    if _request_state.catalog_version is None:
+        _request_state.catalog_version = read_catalog_version()
+    return _request_state.catalog_version
+
+
+def bump_catalog_version():
+    """Invalidate the catalog snapshots of every process.
+
+    The row is updated in the transaction of the change, so processes
+    see the new version together with the new data. Versions follow the
+    clock, so they do not repeat after the database is rolled back or
+    restored while cached entries keyed on them live on.
+    """
+    version = time.time_ns()
+    if not CatalogVersion.objects.filter(pk=CATALOG_VERSION_ID).update(
+        version=Greatest(F('version') + 1, Value(version))
+    ):
+        CatalogVersion.objects.get_or_create(
+            pk=CATALOG_VERSION_ID, defaults={'version': version})
+    if hasattr(_request_state, 'catalog_version'):
+        _request_state.catalog_version = None
+
+
+def build_catalog(version):
+    return Catalog(
+        version,
+        tuple(
+            TagRecord(*row)
+            for row in Tag.objects.values_list('id', 'name', 'slug')
+        ),
+        tuple(
+            IngredientRecord(*row)
+            for row in Ingredient.objects.order_by('id').values_list(
+                'id', 'name', 'measurement_unit')
+        ),
+    )
+
+
+def get_catalog():
+    """Return the current catalog, rebuilding it if it went stale.
+
+    The version counter is a database row, so a bump from any process,
+    ``loaddata`` included, is seen by all of them; snapshots older than
+    ``CATALOG_MAX_AGE`` seconds are rebuilt regardless.
+    """
+    global _catalog
+    version = get_catalog_version()
+    catalog = _catalog
+    if catalog is None or catalog.is_stale(version):
+        with _catalog_lock:
+            catalog = _catalog
+            if catalog is None or catalog.is_stale(version):
+                catalog = _catalog = build_catalog(version)
+    return catalog
@@ -0,0 +1,211 @@
+import logging
+import posixpath
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.dispatch import Signal
+from django.utils import timezone
+
+from recipes.images import (
+    AVATAR_SIZES,
+    RECIPE_IMAGE_SIZES,
+    VARIANTS_DIR,
+    generate_variants,
+    get_variant_names,
+    reencode_image,
+    refresh_variants,
+)
+from recipes.models import ImageJob, Recipe
+from users.constants import ImageStatus
+from users.models import User
+
+MAX_ATTEMPTS = 3
+# Jobs left in processing this long are assumed to belong to a worker
+# that died and are claimed again.
+STALE_AFTER = timedelta(minutes=10)
+
+# Job kind -> (model, image field, variants field, status field, sizes).
+TARGETS = {
+    ImageJob.Kind.RECIPE: (
+        Recipe, 'image', 'image_variants', 'image_status',
+        RECIPE_IMAGE_SIZES
+    ),
+    ImageJob.Kind.AVATAR: (
+        User, 'avatar', 'avatar_variants', 'avatar_status', AVATAR_SIZES
+    ),
+}
+
+# Sent with ``sender=model`` and ``pk`` once a job changed an object.
+image_processed = Signal()
+
+logger = logging.getLogger(__name__)
+
+
+def queue_image_processing(kind, instance):
+    """Queue the instance's image unless its variants are up to date.
+
+    Enqueuing is idempotent: an image is queued once per file name, in
+    the same transaction as the save that set it. Storage names follow
+    the content, so uploading a failed image again saves the same name;
+    its job is then reset to be retried with fresh attempts.
+    """
+    model, field_name, variants_field, status_field, sizes = TARGETS[kind]
+    source = getattr(instance, field_name).name or ''
+    variants = getattr(instance, variants_field) or {}
+    if variants.get('source', '') == source:
+        return
+    if not source:
+        # Nothing to process, the image was removed.
+        refresh_variants(instance, field_name, variants_field, sizes)
+        return
+    # One upsert, without the savepoints of update_or_create.
+    ImageJob.objects.bulk_create(
+        [ImageJob(kind=kind, object_id=instance.pk, source=source)],
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id', 'source'],
+        update_fields=['status', 'attempts', 'error', 'updated_at']
+    )
+    setattr(instance, status_field, ImageStatus.PENDING)
+    model.objects.filter(pk=instance.pk).update(
+        **{status_field: ImageStatus.PENDING})
+
+
+@transaction.atomic
+def claim_image_jobs(batch_size):
+    """Mark a batch of queued jobs as processing and return their IDs.
+
+    ``SKIP LOCKED`` lets several workers claim batches concurrently
+    without waiting on each other. Stale jobs that used up their
+    attempts are failed instead of claimed again.
+    """
+    now = timezone.now()
+    stale = Q(
+        status=ImageJob.Status.PROCESSING, updated_at__lt=now - STALE_AFTER)
+    for job in (
+        ImageJob.objects
+        .select_for_update(skip_locked=True)
+        .filter(stale, attempts__gte=MAX_ATTEMPTS)
+    ):
+        fail_image_job(job, 'The worker stopped while processing the job.')
+    job_ids = list(
+        ImageJob.objects
+        .select_for_update(skip_locked=True)
+        .filter(
+            Q(status=ImageJob.Status.PENDING)
+            | Q(stale, attempts__lt=MAX_ATTEMPTS)
+        )
+        .order_by('id')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    ImageJob.objects.filter(id__in=job_ids).update(
+        status=ImageJob.Status.PROCESSING,
+        attempts=F('attempts') + 1,
+        updated_at=now
+    )
+    return job_ids
+
+
+def run_image_job(job):
+    model, field_name, variants_field, status_field, sizes = TARGETS[job.kind]
+    instance = model.objects.filter(pk=job.object_id).only(
+        'pk', field_name).first()
+    if instance is None or getattr(instance, field_name).name != job.source:
+        # The object is gone or has a newer image with its own job.
+        return
+    field_file = getattr(instance, field_name)
+    field_file.name = reencode_image(field_file)
+    variants = generate_variants(field_file, sizes)
+    # Files written for an image replaced in the meantime are left to
+    # the orphan collection.
+    if model.objects.filter(
+        pk=instance.pk, **{field_name: job.source}
+    ).update(**{
+        field_name: field_file.name,
+        variants_field: variants,
+        status_field: ImageStatus.READY,
+    }):
+        image_processed.send(sender=model, pk=instance.pk)
+
+
+def fail_image_job(job, error):
+    job.error = str(error)
+    if job.attempts < MAX_ATTEMPTS:
+        job.status = ImageJob.Status.PENDING
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        return
+    job.status = ImageJob.Status.FAILED
+    job.save(update_fields=['status', 'error', 'updated_at'])
+    model, field_name, _, status_field, _ = TARGETS[job.kind]
+    if model.objects.filter(
+        pk=job.object_id, **{field_name: job.source}
+    ).update(**{status_field: ImageStatus.FAILED}):
+        image_processed.send(sender=model, pk=job.object_id)
+
+
+def process_image_job(job_id):
+    """Run a claimed job; done jobs are deleted, failed ones retried.
+
+    Every step can safely be repeated, so a job that is run twice, or
+    again after its worker died, ends in the same state.
+    """
+    job = ImageJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return
+    try:
+        run_image_job(job)
+    except Exception as error:
+        # Whatever went wrong, the job must not stay in processing.
+        logger.warning('Image job %s failed.', job.pk, exc_info=True)
+        fail_image_job(job, error)
+    else:
+        job.delete()
+
+
+def get_referenced_media(chunk_size=1000):
+    """Return the names of all files that images and jobs point to."""
+    names = set(ImageJob.objects.values_list('source', flat=True))
+    for model, field_name, variants_field, _, _ in TARGETS.values():
+        rows = model.objects.values_list(field_name, variants_field)
+        for name, variants in rows.iterator(chunk_size):
+            if name:
+                names.add(name)
+            names.update(get_variant_names(variants))
+    return names
+
+
+def find_unreferenced_media(referenced):
+    """Yield ``(storage, name)`` for media files nothing points to."""
+    for model, field_name, _, _, _ in TARGETS.values():
+        field = model._meta.get_field(field_name)
+        for directory in (
+            field.upload_to, posixpath.join(field.upload_to, VARIANTS_DIR)
+        ):
+            if not field.storage.exists(directory):
+                continue
+            for filename in field.storage.listdir(directory)[1]:
+                name = posixpath.join(directory, filename)
+                if name not in referenced:
+                    yield field.storage, name
+
+
+def collect_orphaned_media(min_age, batch_size=500, dry_run=False):
+    """Delete media files that no image or job references any more.
+
+    Files modified within ``min_age`` are kept, as they may belong to a
+    save that is not committed yet or have just been reused by an
+    identical upload; each batch re-checks their age right before the
+    delete. Returns the number of files that were (or with ``dry_run``
+    would be) deleted.
+    """
+    candidates = list(find_unreferenced_media(get_referenced_media()))
+    collected = 0
+    for start in range(0, len(candidates), batch_size):
+        cutoff = timezone.now() - min_age
+        for storage, name in candidates[start:start + batch_size]:
+            if storage.get_modified_time(name) >= cutoff:
+                continue
+            if not dry_run:
+                storage.delete(name)
+            collected += 1
+    return collected
@@ -0,0 +1,144 @@
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+# Variant name -> (width, height, crop). Without cropping the image is
+# only scaled down to fit the box.
+RECIPE_IMAGE_SIZES = {
+    'small': (320, 320, False),
+    'medium': (640, 640, False),
+    'large': (1280, 1280, False),
+}
+AVATAR_SIZES = {
+    'small': (64, 64, True),
+    'medium': (160, 160, True),
+}
+# Output format -> (file extension, Pillow save options).
+FORMATS = {
+    'webp': ('webp', {'quality': 80, 'method': 4}),
+    'avif': ('avif', {'quality': 60, 'speed': 8}),
+}
+VARIANTS_DIR = 'variants'
+# Options used when re-encoding an upload in its own format.
+REENCODE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+    'GIF': {},
+}
+
+logger = logging.getLogger(__name__)
+
+
+def get_formats():
+    return [
+        image_format for image_format in FORMATS
+        if features.check(image_format)
+    ]
+
+
+def variant_name(source_name, size_name, extension):
+    directory, filename = os.path.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(
+        directory, VARIANTS_DIR, f'{stem}_{size_name}.{extension}')
+
+
+def resize(image, width, height, crop):
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    image = image.copy()
+    image.thumbnail((width, height), Image.Resampling.LANCZOS)
+    return image
+
+
+def generate_variants(field_file, sizes):
+    """Render resized WebP/AVIF copies of an image next to it.
+
+    Returns the description stored in ``image_variants``:
+    ``{'source': name, 'sizes': {size: {'width': w, 'height': h,
+    format: path}}}``. Images are never scaled up.
+    """
+    with field_file.open('rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    storage = field_file.storage
+    variants = {}
+    for size_name, (width, height, crop) in sizes.items():
+        resized = resize(
+            image, min(width, image.width), min(height, image.height), crop)
+        variant = {'width': resized.width, 'height': resized.height}
+        for image_format in get_formats():
+            extension, options = FORMATS[image_format]
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, **options)
+            variant[image_format] = storage.save(
+                variant_name(field_file.name, size_name, extension),
+                ContentFile(buffer.getvalue()))
+        variants[size_name] = variant
+    return {'source': field_file.name, 'sizes': variants}
+
+
+def reencode_image(field_file):
+    """Verify an upload with Pillow and store a cleaned copy of it.
+
+    The copy keeps the format, but EXIF orientation is applied and all
+    metadata is dropped. Returns the name of the copy; the upload itself
+    is left to the orphan collection.
+    """
+    with field_file.open('rb') as source:
+        Image.open(source).verify()
+    with field_file.open('rb') as source:
+        image = Image.open(source)
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image_format not in REENCODE_OPTIONS:
+        raise OSError(f'Unsupported image format: {image_format}')
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **REENCODE_OPTIONS[image_format])
+    return field_file.storage.save(
+        field_file.name, ContentFile(buffer.getvalue()))
+
+
+def get_variant_names(variants):
+    """Return the file names listed in an ``image_variants`` value."""
+    return [
+        variant[image_format]
+        for variant in (variants or {}).get('sizes', {}).values()
+        for image_format in FORMATS
+        if image_format in variant
+    ]
+
+
+def refresh_variants(instance, field_name, variants_field, sizes):
+    """Regenerate the variants of an image field if the image changed.
+
+    Saves only the variants column, so no save signals fire again.
+    Returns True if anything was written. Old variants may be shared
+    with other images and are left to the orphan collection.
+    """
+    field_file = getattr(instance, field_name)
+    variants = getattr(instance, variants_field) or {}
+    source = field_file.name or ''
+    if variants.get('source', '') == source:
+        return False
+    try:
+        variants = generate_variants(field_file, sizes) if source else {}
+    except (OSError, Image.DecompressionBombError):
+        # A missing or unreadable original must not break the save; the
+        # generate_image_variants command retries it later.
+        logger.warning('Could not generate variants of %s.', source,
+                       exc_info=True)
+        variants = {}
+    setattr(instance, variants_field, variants)
+    type(instance).objects.filter(pk=instance.pk).update(
+        **{variants_field: variants})
+    return True
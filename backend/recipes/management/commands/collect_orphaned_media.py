@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from recipes.image_jobs import collect_orphaned_media
+
+
+class Command(BaseCommand):
+    help = 'Delete uploaded images and variants no object references.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help='Keep files modified within this many hours.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of files deleted per batch.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report the files that would be deleted.')
+
+    def handle(self, *args, **options):
+        collected = collect_orphaned_media(
+            timedelta(hours=options['min_age']),
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run']
+        )
+        if options['dry_run']:
+            message = f'{collected} orphaned files would be deleted.'
+        else:
+            message = f'{collected} orphaned files deleted.'
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import AVATAR_SIZES, RECIPE_IMAGE_SIZES, refresh_variants
+from recipes.models import Recipe
+from users.models import User
+
+TARGETS = (
+    (Recipe, 'image', 'image_variants', RECIPE_IMAGE_SIZES),
+    (User, 'avatar', 'avatar_variants', AVATAR_SIZES),
+)
+
+
+class Command(BaseCommand):
+    help = 'Generate missing thumbnails and WebP/AVIF image variants.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate variants that are already up to date.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=200,
+            help='Number of rows loaded per query.')
+
+    def handle(self, *args, **options):
+        for model, field_name, variants_field, sizes in TARGETS:
+            generated = 0
+            queryset = model.objects.exclude(**{field_name: ''}).only(
+                'pk', field_name, variants_field)
+            for instance in queryset.iterator(options['chunk_size']):
+                if options['force']:
+                    setattr(instance, variants_field, {})
+                generated += refresh_variants(
+                    instance, field_name, variants_field, sizes)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: {generated} images '
+                'processed.'))
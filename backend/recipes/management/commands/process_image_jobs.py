@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from recipes.image_jobs import claim_image_jobs, process_image_job
+
+
+def process_in_thread(job_id):
+    try:
+        process_image_job(job_id)
+    finally:
+        # Every pool thread has its own database connection.
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Run an image worker that processes queued image jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=settings.IMAGE_WORKER_THREADS,
+            help='Number of jobs processed in parallel.')
+        parser.add_argument(
+            '--batch-size', type=int, default=10,
+            help='Number of jobs claimed at a time.')
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds to wait when the queue is empty.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty.')
+
+    def handle(self, *args, **options):
+        processed = 0
+        with ThreadPoolExecutor(options['threads']) as pool:
+            while True:
+                job_ids = claim_image_jobs(options['batch_size'])
+                if job_ids:
+                    list(pool.map(process_in_thread, job_ids))
+                    processed += len(job_ids)
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{processed} image jobs processed.'))
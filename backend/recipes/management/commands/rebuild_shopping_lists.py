@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import ShoppingCart, ShoppingListItem
+from recipes.services import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify the stored per-user shopping list totals.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Only report users whose totals have drifted.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of users processed per transaction.')
+        parser.add_argument(
+            'user_ids', nargs='*', type=int,
+            help='Limit the run to these users.')
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids'] or sorted(
+            set(ShoppingCart.objects.values_list('user_id', flat=True))
+            | set(ShoppingListItem.objects.values_list('user_id', flat=True))
+        )
+        batch_size = options['batch_size']
+        changed = 0
+        for start in range(0, len(user_ids), batch_size):
+            changed += rebuild_shopping_lists(
+                user_ids[start:start + batch_size],
+                dry_run=options['verify']
+            )
+        if options['verify']:
+            message = f'{changed} shopping list rows are out of date.'
+        else:
+            message = f'{changed} shopping list rows rebuilt.'
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipes.services import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the popularity counters of recipes and users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Only report counters that have drifted.')
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters(dry_run=options['verify'])
+        for label, rows in fixed.items():
+            self.stdout.write(f'{label}: {rows}')
+        if options['verify']:
+            message = f'{sum(fixed.values())} counters are out of date.'
+        else:
+            message = f'{sum(fixed.values())} counters fixed.'
+        self.stdout.write(self.style.SUCCESS(message))
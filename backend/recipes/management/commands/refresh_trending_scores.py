@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from recipes.services import refresh_trending_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute the time-decayed trending scores of recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of rows read or written per query.')
+
+    def handle(self, *args, **options):
+        updated = refresh_trending_scores(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated} trending scores updated.'))
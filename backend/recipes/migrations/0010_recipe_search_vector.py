@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:27
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+FILL_SEARCH_VECTORS = (
+    "UPDATE recipes_recipe SET search_vector = "
+    "setweight(to_tsvector(%s::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector(%s::regconfig, coalesce(text, '')), 'B')"
+)
+CREATE_INDEX = (
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector)'
+)
+DROP_INDEX = 'DROP INDEX IF EXISTS recipes_recipe_search_vector_idx'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        FILL_SEARCH_VECTORS, (settings.SEARCH_CONFIG, settings.SEARCH_CONFIG))
+    schema_editor.execute(CREATE_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_ingredient_name_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Search Vector'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:29
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+FILL_INGREDIENT_IDS = (
+    'UPDATE recipes_recipe SET ingredient_ids = ARRAY('
+    'SELECT ingredient_id FROM recipes_recipeingredient '
+    'WHERE recipe_id = recipes_recipe.id AND ingredient_id IS NOT NULL '
+    'ORDER BY ingredient_id)'
+)
+CREATE_INDEX = (
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_ingredient_ids_idx '
+    'ON recipes_recipe USING gin (ingredient_ids)'
+)
+DROP_INDEX = 'DROP INDEX IF EXISTS recipes_recipe_ingredient_ids_idx'
+
+
+def create_ingredient_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(FILL_INGREDIENT_IDS)
+    schema_editor.execute(CREATE_INDEX)
+
+
+def drop_ingredient_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), editable=False, null=True, size=None, verbose_name='Ingredient IDs'),
+        ),
+        migrations.RunPython(
+            create_ingredient_index, drop_ingredient_index),
+    ]
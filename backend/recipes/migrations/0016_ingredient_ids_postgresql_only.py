@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+def drop_ingredient_ids(apps, schema_editor):
+    # PostgreSQL keeps the column and its GIN index; the filters read it
+    # as raw SQL.
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    schema_editor.remove_field(
+        Recipe, Recipe._meta.get_field('ingredient_ids'))
+
+
+def restore_ingredient_ids(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    schema_editor.add_field(
+        Recipe, Recipe._meta.get_field('ingredient_ids'))
+
+
+class Migration(migrations.Migration):
+    """Take ``ingredient_ids`` out of the model.
+
+    As a model field it made every insert cast ``NULL::bigint[]``, which
+    only PostgreSQL understands.
+    """
+
+    dependencies = [
+        ('recipes', '0015_image_jobs'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='recipe',
+                    name='ingredient_ids',
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(
+                    drop_ingredient_ids, restore_ingredient_ids),
+            ],
+        ),
+    ]
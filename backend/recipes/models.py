@@ -1,6 +1,8 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
+from users.constants import ImageStatus
 from users.models import User
 
 
@@ -46,6 +48,13 @@ class Recipe(models.Model):
         max_length=256, verbose_name='Recipe Name')
     image = models.ImageField(upload_to='recipes/images/',
                               verbose_name='Image Field')
+    image_variants = models.JSONField(
+        default=dict, blank=True, editable=False,
+        verbose_name='Image Variants')
+    image_status = models.CharField(
+        max_length=16, choices=ImageStatus.choices,
+        default=ImageStatus.READY, editable=False,
+        verbose_name='Image Status')
     text = models.TextField(verbose_name='Recipe Text')
     cooking_time = models.PositiveSmallIntegerField(
         validators=[MinValueValidator(1), MinValueValidator(20)],
@@ -60,11 +69,32 @@ class Recipe(models.Model):
         through='RecipeIngredient',
         related_name='recipes',
         verbose_name='Ingredients')
+    search_vector = SearchVectorField(
+        null=True, editable=False, verbose_name='Search Vector')
+    # On PostgreSQL the table also has an ``ingredient_ids bigint[]``
+    # column with a GIN index. It is kept out of the model, so inserts on
+    # other backends never mention it; see ``api.filters``.
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Favorites')
+    carts_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='In Shopping Carts')
+    trending_score = models.FloatField(
+        default=0, editable=False, verbose_name='Trending Score')
 
     class Meta:
         verbose_name = 'Recipe'
         verbose_name_plural = 'Recipes'
         ordering = ['-id']
+        indexes = [
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipe_popularity_idx'
+            ),
+            models.Index(
+                fields=['-trending_score', '-id'],
+                name='recipe_trending_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -117,6 +147,8 @@ class Favorite(models.Model):
         verbose_name='user favorite recipe',
         related_name='favorited_by'
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name='Added At')
 
     class Meta:
         verbose_name = 'Favorite'
@@ -143,6 +175,8 @@ class ShoppingCart(models.Model):
         verbose_name='Recipe in Cart',
         related_name='in_shopping_carts'
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name='Added At')
 
     class Meta:
         verbose_name = 'Shopping Cart'
@@ -154,3 +188,91 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.recipe.name} in {self.user.username}\'s cart'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='User',
+        related_name='shopping_list_items'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ingredient',
+        related_name='shopping_list_items'
+    )
+    total_amount = models.PositiveIntegerField(verbose_name='Total Amount')
+
+    class Meta:
+        verbose_name = 'Shopping List Item'
+        verbose_name_plural = 'Shopping List Items'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'ingredient'],
+            name='unique_shopping_list_item'
+        )]
+
+    def __str__(self):
+        return (f'{self.total_amount} {self.ingredient.measurement_unit} '
+                f'of {self.ingredient.name} for {self.user.username}')
+
+
+class ImageJob(models.Model):
+    """Queued processing of an uploaded image, run by an image worker."""
+
+    class Kind(models.TextChoices):
+        RECIPE = 'recipe', 'Recipe image'
+        AVATAR = 'avatar', 'Avatar'
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        PROCESSING = 'processing', 'Processing'
+        FAILED = 'failed', 'Failed'
+
+    kind = models.CharField(
+        max_length=16, choices=Kind.choices, verbose_name='Kind')
+    object_id = models.PositiveBigIntegerField(verbose_name='Object ID')
+    source = models.CharField(max_length=255, verbose_name='Source File')
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING,
+        verbose_name='Status')
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Attempts')
+    error = models.TextField(blank=True, verbose_name='Last Error')
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name='Created At')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Updated At')
+
+    class Meta:
+        verbose_name = 'Image Job'
+        verbose_name_plural = 'Image Jobs'
+        ordering = ['id']
+        constraints = [models.UniqueConstraint(
+            fields=['kind', 'object_id', 'source'],
+            name='unique_image_job'
+        )]
+        indexes = [models.Index(
+            fields=['status', 'id'], name='image_job_queue_idx')]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.object_id}: {self.source}'
+
+
+class CatalogVersion(models.Model):
+    """Single row counting changes to tags and ingredients.
+
+    Every process compares it with the version of its catalog snapshot
+    (see ``recipes.catalog``).
+    """
+
+    version = models.PositiveBigIntegerField(
+        default=0, verbose_name='Version')
+
+    class Meta:
+        verbose_name = 'Catalog Version'
+        verbose_name_plural = 'Catalog Versions'
+
+    def __str__(self):
+        return str(self.version)
@@ -0,0 +1,314 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingListItem,
+)
+from users.models import Subscription, User
+
+# (model, counter field, counted model, its foreign key to the model)
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+)
+# The array column exists on PostgreSQL only and is not a model field.
+UPDATE_INGREDIENT_ARRAYS = (
+    'UPDATE recipes_recipe SET ingredient_ids = ARRAY('
+    'SELECT ingredient_id FROM recipes_recipeingredient '
+    'WHERE recipe_id = recipes_recipe.id AND ingredient_id IS NOT NULL '
+    'ORDER BY ingredient_id) '
+    'WHERE id = ANY(%s)'
+)
+# Upsert of shopping list totals; valid on PostgreSQL and SQLite.
+ADD_TO_SHOPPING_LIST_ITEMS = (
+    'INSERT INTO {table} (user_id, ingredient_id, total_amount) '
+    'VALUES {values} '
+    'ON CONFLICT (user_id, ingredient_id) DO UPDATE '
+    'SET total_amount = {table}.total_amount + EXCLUDED.total_amount'
+)
+# Rows per upsert, well within the bind parameter limits.
+UPSERT_BATCH_SIZE = 1000
+# Activity counted towards the trending score, with its weight.
+TRENDING_ACTIVITY = (
+    (Favorite, 1.0),
+    (ShoppingCart, 0.5),
+)
+
+
+def get_recipe_amounts(recipe_id):
+    """Return ``{ingredient_id: amount}`` for a recipe."""
+    return dict(
+        RecipeIngredient.objects.filter(
+            recipe_id=recipe_id, ingredient__isnull=False
+        ).values_list('ingredient_id', 'amount')
+    )
+
+
+def add_to_shopping_list_items(user_ids, increments):
+    """Add ``{ingredient_id: amount > 0}`` to the users' totals.
+
+    A single upsert adds to the stored totals in the database, so
+    concurrent additions of the same ingredient neither fail on the
+    unique constraint nor overwrite each other.
+    """
+    rows = [
+        (user_id, ingredient_id, amount)
+        for user_id in user_ids
+        for ingredient_id, amount in increments.items()
+    ]
+    if not rows:
+        return
+    table = connection.ops.quote_name(ShoppingListItem._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            cursor.execute(
+                ADD_TO_SHOPPING_LIST_ITEMS.format(
+                    table=table,
+                    values=', '.join(['(%s, %s, %s)'] * len(batch))
+                ),
+                [value for row in batch for value in row]
+            )
+
+
+@transaction.atomic
+def apply_shopping_list_deltas(user_ids, deltas):
+    """Add ``{ingredient_id: delta}`` to the shopping lists of the users.
+
+    Increments are upserted. For decrements the existing totals are
+    locked and lowered in place, and totals that drop to zero are
+    removed.
+    """
+    if not user_ids:
+        return
+    add_to_shopping_list_items(user_ids, {
+        ingredient_id: delta for ingredient_id, delta in deltas.items()
+        if delta > 0
+    })
+    decrements = {
+        ingredient_id: delta for ingredient_id, delta in deltas.items()
+        if delta < 0
+    }
+    if not decrements:
+        return
+    to_update, to_delete = [], []
+    for item in ShoppingListItem.objects.select_for_update().filter(
+        user_id__in=user_ids, ingredient_id__in=decrements
+    ):
+        item.total_amount += decrements[item.ingredient_id]
+        if item.total_amount > 0:
+            to_update.append(item)
+        else:
+            to_delete.append(item.pk)
+    ShoppingListItem.objects.bulk_update(to_update, ['total_amount'])
+    ShoppingListItem.objects.filter(pk__in=to_delete).delete()
+
+
+def add_recipe_to_shopping_list(user_id, recipe_id, sign=1):
+    """Add (or with ``sign=-1`` remove) a recipe's amounts for a user."""
+    apply_shopping_list_deltas([user_id], {
+        ingredient_id: sign * amount
+        for ingredient_id, amount in get_recipe_amounts(recipe_id).items()
+    })
+
+
+def update_recipe_in_shopping_lists(recipe_id, old_amounts, new_amounts):
+    """Propagate a change of a recipe's ingredients to carts holding it."""
+    deltas = {
+        ingredient_id: (new_amounts.get(ingredient_id, 0)
+                        - old_amounts.get(ingredient_id, 0))
+        for ingredient_id in old_amounts.keys() | new_amounts.keys()
+    }
+    if not any(deltas.values()):
+        return
+    user_ids = list(ShoppingCart.objects.filter(
+        recipe_id=recipe_id).values_list('user_id', flat=True))
+    apply_shopping_list_deltas(user_ids, deltas)
+
+
+def get_expected_shopping_lists(user_ids):
+    """Recompute ``{user_id: {ingredient_id: total}}`` from the carts."""
+    totals = defaultdict(dict)
+    rows = (
+        RecipeIngredient.objects
+        .filter(
+            recipe__in_shopping_carts__user__in=user_ids,
+            ingredient__isnull=False
+        )
+        .values('recipe__in_shopping_carts__user', 'ingredient_id')
+        .annotate(total_amount=Sum('amount'))
+        .order_by()
+    )
+    for row in rows:
+        user_id = row['recipe__in_shopping_carts__user']
+        totals[user_id][row['ingredient_id']] = row['total_amount']
+    return totals
+
+
+@transaction.atomic
+def rebuild_shopping_lists(user_ids, dry_run=False):
+    """Bring stored shopping list totals of the users back in line.
+
+    Returns the number of rows that were (or with ``dry_run`` would be)
+    created, updated or deleted.
+    """
+    expected = get_expected_shopping_lists(user_ids)
+    stored = ShoppingListItem.objects.select_for_update().filter(
+        user_id__in=user_ids)
+    to_update, to_delete = [], []
+    for item in stored:
+        total = expected[item.user_id].pop(item.ingredient_id, None)
+        if total is None:
+            to_delete.append(item.pk)
+        elif total != item.total_amount:
+            item.total_amount = total
+            to_update.append(item)
+    to_create = [
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id, total_amount=total)
+        for user_id, amounts in expected.items()
+        for ingredient_id, total in amounts.items()
+    ]
+    if not dry_run:
+        ShoppingListItem.objects.bulk_create(to_create)
+        ShoppingListItem.objects.bulk_update(to_update, ['total_amount'])
+        ShoppingListItem.objects.filter(pk__in=to_delete).delete()
+    return len(to_create) + len(to_update) + len(to_delete)
+
+
+def get_search_vector():
+    """Weighted full-text vector: name matches rank above text ones."""
+    return (
+        SearchVector('name', weight='A', config=settings.SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=settings.SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """Recompute the stored ``tsvector`` of the recipes on PostgreSQL."""
+    if connection.vendor != 'postgresql':
+        return
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        search_vector=get_search_vector())
+
+
+def update_ingredient_arrays(recipe_ids):
+    """Refresh the denormalized ``ingredient_ids`` arrays on PostgreSQL."""
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(UPDATE_INGREDIENT_ARRAYS, [list(recipe_ids)])
+
+
+def adjust_counter(model, pk, field, delta):
+    """Atomically add ``delta`` to a counter column of one row.
+
+    Decrements never take a counter below zero; drift of that kind is
+    left to ``reconcile_counters``.
+    """
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def count_related(model, field):
+    """Subquery counting the ``model`` rows pointing at the outer row."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def reconcile_counters(dry_run=False):
+    """Recount every counter column and fix the rows that drifted.
+
+    Returns ``{'Model.field': rows}`` with the number of rows that were
+    (or with ``dry_run`` would be) corrected.
+    """
+    fixed = {}
+    for model, field, related_model, related_field in COUNTERS:
+        drifted = model.objects.alias(
+            actual=count_related(related_model, related_field)
+        ).exclude(**{field: F('actual')})
+        label = f'{model.__name__}.{field}'
+        if dry_run:
+            fixed[label] = drifted.count()
+        else:
+            fixed[label] = drifted.update(
+                **{field: count_related(related_model, related_field)})
+    return fixed
+
+
+def get_trending_scores(now, chunk_size):
+    """Sum the decayed weights of recent activity per recipe.
+
+    Each favorite or cart add loses half of its weight every
+    ``TRENDING_HALF_LIFE_HOURS``; activity older than
+    ``TRENDING_WINDOW_DAYS`` is ignored. Rows are read by primary key in
+    chunks of ``chunk_size``, so no query holds a long snapshot.
+    """
+    since = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    decay = math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+    scores = defaultdict(float)
+    for model, weight in TRENDING_ACTIVITY:
+        last_id = 0
+        while True:
+            rows = list(
+                model.objects
+                .filter(created_at__gte=since, id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'recipe_id', 'created_at')[:chunk_size]
+            )
+            if not rows:
+                break
+            for row_id, recipe_id, created_at in rows:
+                age = (now - created_at).total_seconds()
+                scores[recipe_id] += weight * math.exp(-decay * age)
+            last_id = rows[-1][0]
+    return scores
+
+
+def refresh_trending_scores(chunk_size=1000):
+    """Store freshly computed trending scores, a chunk at a time.
+
+    Every write is a short statement of its own, outside of any
+    transaction spanning the run, so requests are never kept waiting on
+    row locks. Returns the number of recipes whose score was written.
+    """
+    scores = get_trending_scores(timezone.now(), chunk_size)
+    cooled = [
+        recipe_id
+        for recipe_id in Recipe.objects.filter(
+            trending_score__gt=0).values_list('id', flat=True)
+        if recipe_id not in scores
+    ]
+    for start in range(0, len(cooled), chunk_size):
+        Recipe.objects.filter(
+            id__in=cooled[start:start + chunk_size]).update(trending_score=0)
+    Recipe.objects.bulk_update(
+        [
+            Recipe(id=recipe_id, trending_score=score)
+            for recipe_id, score in scores.items()
+        ],
+        ['trending_score'],
+        batch_size=chunk_size
+    )
+    return len(scores) + len(cooled)
@@ -0,0 +1,89 @@
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes.catalog import bump_catalog_version, finish_request, start_request
+from recipes.image_jobs import queue_image_processing
+from recipes.models import ImageJob, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.services import (
+    COUNTERS,
+    add_recipe_to_shopping_list,
+    adjust_counter,
+    update_search_vectors,
+)
+from users.models import User
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_cart_item_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        add_recipe_to_shopping_list(instance.user_id, instance.recipe_id)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_cart_item_from_shopping_list(sender, instance, **kwargs):
+    # pre_delete runs before a cascading recipe delete removes the
+    # recipe's ingredients, so the amounts can still be subtracted.
+    add_recipe_to_shopping_list(instance.user_id, instance.recipe_id, -1)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_catalog(sender, **kwargs):
+    # Also fires for every object of a ``loaddata`` fixture.
+    bump_catalog_version()
+
+
+request_started.connect(start_request, dispatch_uid='catalog_start_request')
+request_finished.connect(
+    finish_request, dispatch_uid='catalog_finish_request')
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, **kwargs):
+    update_search_vectors([instance.pk])
+
+
+def counters_of(sender):
+    for model, field, related_model, related_field in COUNTERS:
+        if related_model is sender:
+            yield model, field, f'{related_field}_id'
+
+
+def increment_counters(sender, instance, created, **kwargs):
+    if not created:
+        return
+    for model, field, attname in counters_of(sender):
+        adjust_counter(model, getattr(instance, attname), field, 1)
+
+
+def decrement_counters(sender, instance, origin=None, **kwargs):
+    for model, field, attname in counters_of(sender):
+        pk = getattr(instance, attname)
+        if isinstance(origin, model) and origin.pk == pk:
+            # Cascade from deleting the counted row itself.
+            continue
+        adjust_counter(model, pk, field, -1)
+
+
+for _, _, counted_model, _ in COUNTERS:
+    post_save.connect(
+        increment_counters, sender=counted_model,
+        dispatch_uid=f'increment_counters_{counted_model.__name__}')
+    post_delete.connect(
+        decrement_counters, sender=counted_model,
+        dispatch_uid=f'decrement_counters_{counted_model.__name__}')
+
+
+@receiver(post_save, sender=Recipe)
+def queue_recipe_image(sender, instance, update_fields, **kwargs):
+    if update_fields is None or 'image' in update_fields:
+        queue_image_processing(ImageJob.Kind.RECIPE, instance)
+
+
+@receiver(post_save, sender=User)
+def queue_avatar(sender, instance, update_fields, **kwargs):
+    if update_fields is None or 'avatar' in update_fields:
+        queue_image_processing(ImageJob.Kind.AVATAR, instance)
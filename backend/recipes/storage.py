@@ -0,0 +1,39 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming every file by the SHA-256 of its data.
+
+    The directory and extension of the requested name are kept, the rest
+    is replaced by the digest, so saving the same bytes twice stores one
+    file. Stored files are never changed or removed on behalf of a
+    single object, as others may share them; unreferenced files are
+    removed by the ``collect_orphaned_media`` command.
+    """
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest.hexdigest() + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            # Refresh the modification time, so a file that has just
+            # been referenced again is not collected as an orphan.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
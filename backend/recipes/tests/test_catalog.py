@@ -0,0 +1,85 @@
+import gzip
+import json
+
+from recipes.models import Ingredient, Tag
+from recipes.tests.utils import APITestBase
+
+TAGS_URL = '/api/tags/'
+INGREDIENTS_URL = '/api/ingredients/'
+
+
+class CatalogResponseTests(APITestBase):
+    """Catalog lists are served with ETags, gzipped if accepted."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.eggs = Ingredient.objects.create(name='eggs', measurement_unit='g')
+
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def test_list_has_etag(self):
+        for url in (TAGS_URL, INGREDIENTS_URL):
+            with self.subTest(url=url):
+                response = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response['ETag'].startswith('"'))
+                self.assertNotIn('Content-Encoding', response)
+                self.assertIn('Accept-Encoding', response['Vary'])
+                # Repeated requests get the same ETag.
+                self.assertEqual(self.get(url)['ETag'], response['ETag'])
+        self.assertEqual(
+            self.get(TAGS_URL).json(),
+            list(Tag.objects.values('id', 'name', 'slug'))
+        )
+
+    def test_matching_if_none_match_is_not_modified(self):
+        etag = self.get(TAGS_URL)['ETag']
+        for if_none_match in (etag, f'"other", {etag}', '*'):
+            with self.subTest(if_none_match=if_none_match):
+                response = self.get(TAGS_URL, if_none_match=if_none_match)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], etag)
+        response = self.get(TAGS_URL, if_none_match='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_tag_change_gives_a_new_etag(self):
+        etag = self.get(TAGS_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Quick', slug='quick-test')
+        response = self.get(TAGS_URL, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('quick-test', [tag['slug'] for tag in response.json()])
+
+    def test_ingredient_change_gives_a_new_etag(self):
+        etag = self.get(INGREDIENTS_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.eggs.measurement_unit = 'pcs'
+            self.eggs.save()
+        response = self.get(INGREDIENTS_URL, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json(), [
+            {'id': self.eggs.id, 'name': 'eggs', 'measurement_unit': 'pcs'}])
+
+    def test_gzip(self):
+        plain = self.get(TAGS_URL)
+        response = self.get(TAGS_URL, accept_encoding='br, gzip;q=0.9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            json.loads(gzip.decompress(response.content)), plain.json())
+        # The encodings are different representations.
+        self.assertNotEqual(response['ETag'], plain['ETag'])
+        self.assertEqual(
+            self.get(TAGS_URL, accept_encoding='gzip',
+                     if_none_match=response['ETag']).status_code,
+            304
+        )
+        self.assertEqual(
+            self.get(TAGS_URL, accept_encoding='gzip',
+                     if_none_match=plain['ETag']).status_code,
+            200
+        )
@@ -0,0 +1,122 @@
+import io
+
+from django.core.management import call_command
+
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from recipes.services import reconcile_counters
+from recipes.tests.utils import APITestBase, create_recipe, create_user
+from users.models import Subscription, User
+
+
+class CounterTests(APITestBase):
+    """Popularity counters follow the rows they count."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('cook')
+        cls.fan = create_user('fan')
+        cls.recipe = create_recipe(cls.author, [
+            Ingredient.objects.create(name='eggs', measurement_unit='pcs')])
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.fan)
+
+    def assert_counters(self, instance, **counters):
+        instance.refresh_from_db(fields=counters)
+        for field, value in counters.items():
+            self.assertEqual(getattr(instance, field), value, field)
+
+    def assert_no_drift(self):
+        self.assertEqual(sum(reconcile_counters(dry_run=True).values()), 0)
+
+    def test_favorite_and_cart(self):
+        for action, field in (
+            ('favorite', 'favorites_count'),
+            ('shopping_cart', 'carts_count'),
+        ):
+            with self.subTest(action=action):
+                url = f'/api/recipes/{self.recipe.id}/{action}/'
+                self.assertEqual(self.client.post(url).status_code, 201)
+                self.assert_counters(self.recipe, **{field: 1})
+                # A duplicate is rejected and not counted.
+                self.assertEqual(self.client.post(url).status_code, 400)
+                self.assert_counters(self.recipe, **{field: 1})
+                self.assertEqual(self.client.delete(url).status_code, 204)
+                self.assert_counters(self.recipe, **{field: 0})
+                self.assertEqual(self.client.delete(url).status_code, 400)
+                self.assert_counters(self.recipe, **{field: 0})
+
+    def test_subscribe(self):
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assert_counters(self.author, followers_count=1)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assert_counters(self.author, followers_count=0)
+
+    def test_recipes_count(self):
+        self.assert_counters(self.author, recipes_count=1)
+        create_recipe(self.author, [])
+        self.assert_counters(self.author, recipes_count=2)
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assert_counters(self.author, recipes_count=1)
+        self.assert_no_drift()
+
+    def test_recipe_delete_cascade(self):
+        Favorite.objects.create(user=self.fan, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.fan, recipe=self.recipe)
+        Favorite.objects.create(user=self.author, recipe=self.recipe)
+        self.recipe.delete()
+        self.assert_counters(self.author, recipes_count=0)
+        self.assert_no_drift()
+
+    def test_user_delete_cascade(self):
+        fan_recipe = create_recipe(self.fan, [])
+        Favorite.objects.create(user=self.fan, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.fan, recipe=self.recipe)
+        Favorite.objects.create(user=self.author, recipe=fan_recipe)
+        Subscription.objects.create(user=self.fan, author=self.author)
+        Subscription.objects.create(user=self.author, author=self.fan)
+        self.fan.delete()
+        self.assert_counters(self.recipe, favorites_count=0, carts_count=0)
+        self.assert_counters(self.author, followers_count=0)
+        self.assert_no_drift()
+        self.author.delete()
+        self.assertFalse(Recipe.objects.exists())
+
+
+class ReconcileCountersTests(APITestBase):
+    """reconcile_counters repairs drifted counters."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('cook')
+        cls.recipe = create_recipe(cls.author, [])
+        Favorite.objects.create(user=cls.author, recipe=cls.recipe)
+
+    def setUp(self):
+        super().setUp()
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            favorites_count=5, carts_count=3)
+        User.objects.filter(pk=self.author.pk).update(recipes_count=0)
+
+    def test_reconcile_fixes_drifted_counters(self):
+        self.assertEqual(reconcile_counters(), {
+            'Recipe.favorites_count': 1,
+            'Recipe.carts_count': 1,
+            'User.recipes_count': 1,
+            'User.followers_count': 0,
+        })
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual((recipe.favorites_count, recipe.carts_count), (1, 0))
+        self.assertEqual(User.objects.get(pk=self.author.pk).recipes_count, 1)
+        self.assertEqual(sum(reconcile_counters().values()), 0)
+
+    def test_verify_changes_nothing(self):
+        stdout = io.StringIO()
+        call_command('reconcile_counters', '--verify', stdout=stdout)
+        self.assertIn('3 counters are out of date.', stdout.getvalue())
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).favorites_count, 5)
@@ -0,0 +1,39 @@
+from django.test import override_settings
+
+from recipes.models import Ingredient
+from recipes.tests.utils import APITestBase, create_recipe, create_user
+from users.constants import ImageStatus
+from users.models import User
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class RecipeFragmentTests(APITestBase):
+    """Cached recipe fragments must not leak one request's host."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('cook')
+        cls.author.avatar = 'avatars/cook.png'
+        cls.author.save()
+        User.objects.filter(pk=cls.author.pk).update(
+            avatar_status=ImageStatus.READY)
+        cls.recipe = create_recipe(cls.author, [
+            Ingredient.objects.create(name='eggs', measurement_unit='pcs')])
+        cls.viewer = create_user('viewer')
+
+    def get_avatar(self, url, host):
+        response = self.client.get(url, HTTP_HOST=host)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data['results'][0] if 'results' in data else data
+
+    def test_avatar_follows_request_host(self):
+        self.client.force_authenticate(self.viewer)
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.id}/'):
+            with self.subTest(url=url):
+                self.get_avatar(url, 'evil.example:81')
+                recipe = self.get_avatar(url, 'canvastudio.ru')
+                self.assertEqual(
+                    recipe['author']['avatar'],
+                    'http://canvastudio.ru/media/avatars/cook.png'
+                )
@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.utils import timezone
+
+from recipes import image_jobs
+from recipes.models import ImageJob, Recipe
+from recipes.tests.utils import APITestBase, create_recipe, create_user
+from users.constants import ImageStatus
+
+
+class ImageJobFailureTests(APITestBase):
+    """A job never stays in processing, nor is it retried forever."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = create_recipe(create_user('cook'), [])
+        self.job = ImageJob.objects.get(object_id=self.recipe.pk)
+
+    def test_unexpected_error_fails_the_attempt(self):
+        image_jobs.claim_image_jobs(10)
+        with self.assertLogs(image_jobs.logger, 'WARNING'), mock.patch.object(
+            image_jobs, 'run_image_job', side_effect=RuntimeError('boom')
+        ):
+            image_jobs.process_image_job(self.job.pk)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ImageJob.Status.PENDING)
+        self.assertEqual(self.job.error, 'boom')
+
+    def test_stale_job_out_of_attempts_is_failed(self):
+        ImageJob.objects.filter(pk=self.job.pk).update(
+            status=ImageJob.Status.PROCESSING,
+            attempts=image_jobs.MAX_ATTEMPTS,
+            updated_at=timezone.now() - image_jobs.STALE_AFTER * 2
+        )
+        self.assertEqual(image_jobs.claim_image_jobs(10), [])
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ImageJob.Status.FAILED)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).image_status,
+            ImageStatus.FAILED
+        )
+
+    def test_stale_job_with_attempts_left_is_claimed(self):
+        ImageJob.objects.filter(pk=self.job.pk).update(
+            status=ImageJob.Status.PROCESSING,
+            attempts=image_jobs.MAX_ATTEMPTS - 1,
+            updated_at=timezone.now() - image_jobs.STALE_AFTER * 2
+        )
+        self.assertEqual(image_jobs.claim_image_jobs(10), [self.job.pk])
+
+    def test_saving_a_failed_image_again_requeues_it(self):
+        ImageJob.objects.filter(pk=self.job.pk).update(
+            status=ImageJob.Status.FAILED,
+            attempts=image_jobs.MAX_ATTEMPTS,
+            error='boom'
+        )
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_status=ImageStatus.FAILED)
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        recipe.save()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ImageJob.Status.PENDING)
+        self.assertEqual(self.job.attempts, 0)
+        self.assertEqual(self.job.error, '')
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).image_status,
+            ImageStatus.PENDING
+        )
+        self.assertEqual(image_jobs.claim_image_jobs(10), [self.job.pk])
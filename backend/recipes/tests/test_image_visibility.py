@@ -0,0 +1,69 @@
+from recipes.image_jobs import claim_image_jobs, process_image_job
+from recipes.models import Ingredient, Recipe
+from recipes.tests.utils import (
+    APITestBase,
+    create_recipe,
+    create_user,
+    make_base64_image,
+)
+from users.constants import ImageStatus
+from users.models import User
+
+
+class ImageVisibilityTests(APITestBase):
+    """Uploads are served only once a job has verified them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('cook')
+        cls.author.avatar = 'avatars/cook.png'
+        cls.author.save()
+        cls.recipe = create_recipe(cls.author, [
+            Ingredient.objects.create(name='eggs', measurement_unit='pcs')])
+
+    def get_recipe(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_unprocessed_images_are_hidden(self):
+        for status in (ImageStatus.PENDING, ImageStatus.FAILED):
+            with self.subTest(status=status):
+                self.setUp()
+                Recipe.objects.filter(pk=self.recipe.pk).update(
+                    image_status=status)
+                User.objects.filter(pk=self.author.pk).update(
+                    avatar_status=status)
+                recipe = self.get_recipe()
+                self.assertEqual(recipe['image'], '')
+                self.assertIsNone(recipe['author']['avatar'])
+
+    def test_ready_images_are_served(self):
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_status=ImageStatus.READY)
+        User.objects.filter(pk=self.author.pk).update(
+            avatar_status=ImageStatus.READY)
+        recipe = self.get_recipe()
+        self.assertTrue(recipe['image'].endswith('/media/recipes/images/test.png'))
+        self.assertTrue(recipe['author']['avatar'].endswith('/media/avatars/cook.png'))
+
+
+class AvatarUploadResponseTests(APITestBase):
+    """The avatar PUT response hides the upload until it is processed."""
+
+    def test_upload_is_served_after_processing(self):
+        user = create_user('cook')
+        self.client.force_authenticate(user)
+        response = self.client.put(
+            '/api/users/me/avatar/', {'avatar': make_base64_image()},
+            format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {'avatar': None, 'avatar_status': ImageStatus.PENDING})
+        for job_id in claim_image_jobs(10):
+            process_image_job(job_id)
+        # force_authenticate keeps serving the same user object.
+        user.refresh_from_db()
+        avatar = self.client.get('/api/users/me/').json()['avatar']
+        self.assertTrue(avatar.startswith('http://testserver/media/avatars/'))
@@ -0,0 +1,107 @@
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.tests.utils import (
+    APITestBase,
+    create_recipe,
+    create_user,
+    make_base64_image,
+)
+
+
+class IngredientFilterTests(APITestBase):
+    """The ingredient-set filters, on whichever backend the tests use."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('cook')
+        cls.eggs, cls.flour, cls.milk, cls.salt = (
+            Ingredient.objects.create(name=name, measurement_unit='g')
+            for name in ('eggs', 'flour', 'milk', 'salt')
+        )
+        cls.pancakes = create_recipe(
+            cls.author, [cls.eggs, cls.flour, cls.milk], name='Pancakes')
+        cls.omelette = create_recipe(
+            cls.author, [cls.eggs, cls.salt], name='Omelette')
+
+    def get_recipe_ids(self, **params):
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.json()['results']}
+
+    def ids(self, *ingredients):
+        return ','.join(str(ingredient.id) for ingredient in ingredients)
+
+    def test_create_recipe_through_api(self):
+        self.client.force_authenticate(self.author)
+        tag = Tag.objects.create(name='Quick', slug='quick-test')
+        response = self.client.post('/api/recipes/', {
+            'ingredients': [
+                {'id': self.flour.id, 'amount': 200},
+                {'id': self.milk.id, 'amount': 300},
+            ],
+            'tags': [tag.id],
+            'name': 'Crepes',
+            'text': 'Whisk and fry.',
+            'cooking_time': 20,
+            'image': make_base64_image(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(
+            self.get_recipe_ids(ingredients=self.ids(self.flour, self.milk)),
+            {self.pancakes.id, response.json()['id']}
+        )
+        self.assertTrue(Recipe.objects.filter(name='Crepes').exists())
+
+    def test_contains_all(self):
+        self.assertEqual(
+            self.get_recipe_ids(ingredients=self.ids(self.eggs, self.flour)),
+            {self.pancakes.id}
+        )
+        self.assertEqual(
+            self.get_recipe_ids(ingredients=self.ids(self.eggs)),
+            {self.pancakes.id, self.omelette.id}
+        )
+
+    def test_contains_any(self):
+        self.assertEqual(
+            self.get_recipe_ids(
+                ingredients_any=self.ids(self.milk, self.salt)),
+            {self.pancakes.id, self.omelette.id}
+        )
+        self.assertEqual(
+            self.get_recipe_ids(ingredients_any=self.ids(self.milk)),
+            {self.pancakes.id}
+        )
+
+    def test_available_ingredients(self):
+        self.assertEqual(
+            self.get_recipe_ids(
+                available_ingredients=self.ids(self.eggs, self.salt)),
+            {self.omelette.id}
+        )
+        self.assertEqual(
+            self.get_recipe_ids(
+                available_ingredients=self.ids(self.eggs, self.flour)),
+            set()
+        )
+        self.assertEqual(
+            self.get_recipe_ids(
+                available_ingredients=self.ids(self.eggs, self.flour),
+                max_missing=1
+            ),
+            {self.pancakes.id, self.omelette.id}
+        )
+
+    def test_unknown_ingredient_matches_nothing(self):
+        self.assertEqual(self.get_recipe_ids(ingredients='999999'), set())
+        self.assertEqual(
+            self.get_recipe_ids(ingredients_any=self.ids(self.salt) + ',999999'),
+            {self.omelette.id}
+        )
+
+    def test_malformed_ingredients_are_rejected(self):
+        for name in ('ingredients', 'ingredients_any', 'available_ingredients'):
+            for value in ('eggs', f'{self.eggs.id},x', '1.5.2'):
+                with self.subTest(name=name, value=value):
+                    response = self.client.get('/api/recipes/', {name: value})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(name, response.json())
@@ -0,0 +1,29 @@
+from recipes.models import Ingredient
+from recipes.tests.utils import APITestBase
+
+
+class IngredientSearchTests(APITestBase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='g')
+            for name in ('Sugar', 'brown sugar', 'Salt', 'sugar syrup', 'Rum')
+        )
+
+    def search(self, **params):
+        response = self.client.get('/api/ingredients/', params)
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.json()]
+
+    def test_prefix_matches_come_first(self):
+        self.assertEqual(
+            self.search(name='sug'), ['Sugar', 'sugar syrup', 'brown sugar'])
+
+    def test_short_values_match_prefixes_only(self):
+        self.assertEqual(self.search(name='ru'), ['Rum'])
+
+    def test_limit(self):
+        self.assertEqual(self.search(name='sug', limit=1), ['Sugar'])
+        self.assertEqual(len(self.search(limit=2)), 2)
+        self.assertEqual(len(self.search()), Ingredient.objects.count())
@@ -0,0 +1,127 @@
+import io
+import os
+import shutil
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image
+
+from recipes.image_jobs import (
+    claim_image_jobs,
+    collect_orphaned_media,
+    process_image_job,
+)
+from recipes.images import get_variant_names
+from recipes.tests.utils import APITestBase, create_recipe, create_user
+from users.models import User
+
+DAY = 24 * 60 * 60
+
+
+def make_png(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue())
+
+
+def make_old(name):
+    modified = time.time() - DAY
+    os.utime(default_storage.path(name), (modified, modified))
+
+
+class MediaStorageTestBase(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+
+class ContentAddressedStorageTests(MediaStorageTestBase):
+    """Files are named by their content."""
+
+    def test_identical_uploads_are_stored_once(self):
+        first = default_storage.save('recipes/images/a.png', make_png('red'))
+        second = default_storage.save('recipes/images/b.PNG', make_png('red'))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('recipes/images/'))
+        self.assertTrue(first.endswith('.png'))
+        self.assertEqual(
+            default_storage.listdir('recipes/images/')[1],
+            [os.path.basename(first)]
+        )
+
+    def test_different_uploads_get_different_names(self):
+        self.assertNotEqual(
+            default_storage.save('recipes/images/a.png', make_png('red')),
+            default_storage.save('recipes/images/a.png', make_png('blue'))
+        )
+
+    def test_saving_again_refreshes_the_modification_time(self):
+        name = default_storage.save('recipes/images/a.png', make_png('red'))
+        make_old(name)
+        default_storage.save('recipes/images/b.png', make_png('red'))
+        self.assertGreater(
+            os.path.getmtime(default_storage.path(name)), time.time() - 60)
+
+
+class CollectOrphanedMediaTests(MediaStorageTestBase):
+    """Only old files that nothing references are deleted."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = create_recipe(create_user('cook'), [])
+        self.recipe.image = default_storage.save(
+            'recipes/images/dish.png', make_png('red'))
+        self.recipe.save()
+        self.user = User.objects.get(username='cook')
+        self.user.avatar = default_storage.save(
+            'avatars/cook.png', make_png('green'))
+        self.user.save()
+        for job_id in claim_image_jobs(10):
+            process_image_job(job_id)
+        self.recipe.refresh_from_db()
+        self.user.refresh_from_db()
+        self.referenced = [
+            self.recipe.image.name,
+            self.user.avatar.name,
+            *get_variant_names(self.recipe.image_variants),
+            *get_variant_names(self.user.avatar_variants),
+        ]
+        self.orphan = default_storage.save(
+            'recipes/images/orphan.png', make_png('blue'))
+        for directory, _, filenames in os.walk(settings.MEDIA_ROOT):
+            for filename in filenames:
+                make_old(os.path.join(directory, filename))
+        self.new_orphan = default_storage.save(
+            'avatars/new.png', make_png('yellow'))
+
+    def test_only_old_unreferenced_files_are_deleted(self):
+        self.assertGreater(collect_orphaned_media(timedelta(hours=1)), 0)
+        self.assertFalse(default_storage.exists(self.orphan))
+        self.assertTrue(default_storage.exists(self.new_orphan))
+
+    def test_referenced_files_are_kept(self):
+        # The images themselves and their recipe and avatar variants.
+        self.assertGreater(len(self.referenced), 2)
+        collect_orphaned_media(timedelta(hours=1))
+        for name in self.referenced:
+            with self.subTest(name=name):
+                self.assertTrue(default_storage.exists(name))
+
+    def test_queued_image_is_kept(self):
+        recipe = create_recipe(self.user, [])
+        recipe.image = default_storage.save(
+            'recipes/images/queued.png', make_png('purple'))
+        recipe.save()
+        make_old(recipe.image.name)
+        collect_orphaned_media(timedelta(hours=1))
+        self.assertTrue(default_storage.exists(recipe.image.name))
+
+    def test_dry_run_deletes_nothing(self):
+        call_command('collect_orphaned_media', '--min-age', '1', '--dry-run',
+                     stdout=io.StringIO())
+        self.assertTrue(default_storage.exists(self.orphan))
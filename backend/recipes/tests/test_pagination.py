@@ -0,0 +1,85 @@
+from recipes.models import Ingredient, Recipe
+from recipes.tests.utils import APITestBase, create_recipe, create_user
+from users.models import Subscription
+
+
+class KeysetPaginationTests(APITestBase):
+    """Seven of everything: one page of six and a second page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        eggs = Ingredient.objects.create(name='eggs', measurement_unit='pcs')
+        cls.authors = [create_user(f'author{index}') for index in range(7)]
+        for author in cls.authors:
+            create_recipe(author, [eggs])
+            Subscription.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def test_subscriptions_keyset(self):
+        response = self.client.get(
+            '/api/users/subscriptions/', {'pagination': 'keyset'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertNotIn('count', data)
+        self.assertEqual(
+            [author['id'] for author in data['results']],
+            [author.id for author in self.authors[:6]]
+        )
+        response = self.client.get(data['next'])
+        self.assertEqual(
+            [author['id'] for author in response.json()['results']],
+            [self.authors[6].id]
+        )
+
+    def test_recipes_keyset_and_ranked_search(self):
+        data = self.client.get(
+            '/api/recipes/', {'pagination': 'keyset'}).json()
+        self.assertNotIn('count', data)
+        data = self.client.get(
+            '/api/recipes/', {'pagination': 'keyset', 'search': 'Recipe'}
+        ).json()
+        self.assertEqual(data['count'], 7)
+
+    def get_ids(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data, [recipe['id'] for recipe in data['results']]
+
+    def test_keyset_links(self):
+        expected = list(Recipe.objects.values_list('id', flat=True))
+        first, first_ids = self.get_ids(
+            '/api/recipes/', {'pagination': 'keyset'})
+        self.assertIsNone(first['previous'])
+        second, second_ids = self.get_ids(first['next'])
+        self.assertNotIn('count', second)
+        self.assertIsNone(second['next'])
+        self.assertEqual(first_ids + second_ids, expected)
+        _, previous_ids = self.get_ids(second['previous'])
+        self.assertEqual(previous_ids, first_ids)
+
+    def test_count_modes(self):
+        for params in (
+            {},
+            {'count': 'exact'},
+            {'count': 'estimate'},
+            {'pagination': 'keyset', 'count': 'exact'},
+            {'pagination': 'keyset', 'count': 'estimate'},
+        ):
+            with self.subTest(**params):
+                data, _ = self.get_ids('/api/recipes/', params)
+                self.assertEqual(data['count'], 7)
+
+    def test_invalid_modes_fall_back_to_the_default(self):
+        data, _ = self.get_ids('/api/recipes/', {'count': 'bogus'})
+        self.assertEqual(data['count'], 7)
+        data, _ = self.get_ids(
+            '/api/recipes/', {'pagination': 'keyset', 'count': 'bogus'})
+        self.assertNotIn('count', data)
+        data, ids = self.get_ids('/api/recipes/', {'pagination': 'bogus'})
+        self.assertEqual(data['count'], 7)
+        self.assertEqual(len(ids), 6)
@@ -0,0 +1,59 @@
+from unittest import mock
+
+from api.pagination import PageNumberOrKeysetPagination
+from recipes.models import Favorite, Ingredient, ShoppingCart, Tag
+from recipes.tests.utils import APITestBase, create_recipe, create_user
+from users.models import Subscription
+
+# Queries of an authenticated recipe page with cold caches: the count,
+# the page with the viewer's flags, the catalog version, the page's
+# ingredient amounts and tag IDs, the catalog's tags and ingredients and
+# the subscribed authors.
+LIST_QUERIES = 8
+
+
+class RecipeListQueryTests(APITestBase):
+    """The number of queries of a recipe page does not grow with it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = create_user('viewer')
+        ingredients = [
+            Ingredient.objects.create(name=f'item{index}', measurement_unit='g')
+            for index in range(3)
+        ]
+        tags = list(Tag.objects.all()[:2])
+        for index in range(12):
+            author = create_user(f'author{index}')
+            recipe = create_recipe(author, ingredients, tags)
+            if index % 2:
+                Subscription.objects.create(user=cls.viewer, author=author)
+                Favorite.objects.create(user=cls.viewer, recipe=recipe)
+            if index % 3:
+                ShoppingCart.objects.create(user=cls.viewer, recipe=recipe)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.viewer)
+
+    def get_page(self, page_size):
+        with mock.patch.object(
+            PageNumberOrKeysetPagination, 'page_size', page_size
+        ):
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), page_size)
+        return response.json()['results']
+
+    def test_query_count_is_flat(self):
+        for page_size in (2, 10):
+            with self.subTest(page_size=page_size):
+                super().setUp()
+                with self.assertNumQueries(LIST_QUERIES):
+                    recipes = self.get_page(page_size)
+                self.assertTrue(any(
+                    recipe['is_favorited'] for recipe in recipes))
+                self.assertTrue(any(
+                    recipe['author']['is_subscribed'] for recipe in recipes))
+                self.assertTrue(any(
+                    recipe['is_in_shopping_cart'] for recipe in recipes))
@@ -0,0 +1,65 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.tests.utils import APITestBase, create_user, make_base64_image
+
+# Upper bounds, savepoints and signal handlers (counters, image job,
+# shopping lists) included. Before set-based validation a 40-ingredient
+# recipe took about 80 queries.
+CREATE_QUERY_BUDGET = 29
+UPDATE_QUERY_BUDGET = 19
+
+
+class RecipeWriteQueryTests(APITestBase):
+    """Writing a recipe costs the same with 1 or 40 ingredients."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('cook')
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'item{index}', measurement_unit='g')
+            for index in range(80)
+        )
+        cls.tag = Tag.objects.create(name='Dinner', slug='dinner-test')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def get_payload(self, ingredients):
+        return {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 5}
+                for ingredient in ingredients
+            ],
+            'tags': [self.tag.id],
+            'name': 'Stew',
+            'text': 'Simmer.',
+            'cooking_time': 20,
+            'image': make_base64_image(),
+        }
+
+    def count_queries(self, method, url, ingredients, status_code):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(
+                url, self.get_payload(ingredients), format='json')
+        self.assertEqual(response.status_code, status_code, response.content)
+        return len(context), response.json()
+
+    def test_create_and_update(self):
+        counts = {}
+        for size in (1, 40):
+            super().setUp()
+            created, recipe = self.count_queries(
+                'post', '/api/recipes/', self.ingredients[:size], 201)
+            # Replace every ingredient, the most expensive diff.
+            updated, _ = self.count_queries(
+                'patch', f'/api/recipes/{recipe["id"]}/',
+                self.ingredients[size:2 * size], 200)
+            self.assertEqual(
+                Recipe.objects.get(pk=recipe['id']).ingredients.count(), size)
+            counts[size] = (created, updated)
+        self.assertEqual(counts[1], counts[40])
+        self.assertLessEqual(counts[40][0], CREATE_QUERY_BUDGET)
+        self.assertLessEqual(counts[40][1], UPDATE_QUERY_BUDGET)
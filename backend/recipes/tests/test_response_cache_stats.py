@@ -0,0 +1,23 @@
+from recipes.tests.utils import APITestBase, create_user
+
+STATS_URL = '/api/cache/stats/'
+
+
+class ResponseCacheStatsTests(APITestBase):
+    """The web process reports its response cache counters to staff."""
+
+    def test_staff_see_counts_of_anonymous_requests(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/recipes/').status_code, 200)
+        staff = create_user('staff')
+        staff.is_staff = True
+        staff.save()
+        self.client.force_authenticate(staff)
+        response = self.client.get(STATS_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['stats']['list'], {'hit': 1, 'miss': 1})
+
+    def test_other_users_are_refused(self):
+        self.client.force_authenticate(create_user('cook'))
+        self.assertEqual(self.client.get(STATS_URL).status_code, 403)
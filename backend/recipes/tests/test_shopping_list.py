@@ -0,0 +1,115 @@
+import csv
+import io
+
+from recipes.models import Ingredient, ShoppingCart, ShoppingListItem
+from recipes.services import apply_shopping_list_deltas
+from recipes.tests.utils import APITestBase, create_recipe, create_user
+
+
+class ShoppingListTotalsTests(APITestBase):
+    """Stored totals follow the cart through upserts and decrements."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.eggs = Ingredient.objects.create(
+            name='eggs', measurement_unit='pcs')
+        cls.milk = Ingredient.objects.create(name='milk', measurement_unit='ml')
+        author = create_user('cook')
+        cls.omelette = create_recipe(author, [cls.eggs, cls.milk])
+        cls.pancakes = create_recipe(author, [cls.eggs], name='Pancakes')
+        cls.user = create_user('shopper')
+
+    def get_totals(self):
+        return dict(ShoppingListItem.objects.filter(
+            user=self.user).values_list('ingredient_id', 'total_amount'))
+
+    def cart(self, method, recipe):
+        return getattr(self.client, method)(
+            f'/api/recipes/{recipe.id}/shopping_cart/')
+
+    def test_shared_ingredients_add_up_and_drop_out(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.cart('post', self.omelette).status_code, 201)
+        self.assertEqual(self.cart('post', self.pancakes).status_code, 201)
+        self.assertEqual(
+            self.get_totals(), {self.eggs.id: 20, self.milk.id: 10})
+        self.assertEqual(self.cart('delete', self.omelette).status_code, 204)
+        self.assertEqual(self.get_totals(), {self.eggs.id: 10})
+        self.assertEqual(self.cart('delete', self.pancakes).status_code, 204)
+        self.assertEqual(self.get_totals(), {})
+
+    def test_mixed_deltas(self):
+        apply_shopping_list_deltas(
+            [self.user.id], {self.eggs.id: 5, self.milk.id: 3})
+        apply_shopping_list_deltas(
+            [self.user.id], {self.eggs.id: 2, self.milk.id: -3})
+        self.assertEqual(self.get_totals(), {self.eggs.id: 7})
+
+
+class ShoppingListDownloadTests(APITestBase):
+    """The cart downloads as text, CSV or PDF with aggregated amounts."""
+
+    URL = '/api/recipes/download_shopping_cart/'
+
+    @classmethod
+    def setUpTestData(cls):
+        eggs = Ingredient.objects.create(name='eggs', measurement_unit='pcs')
+        milk = Ingredient.objects.create(name='milk', measurement_unit='ml')
+        author = create_user('cook')
+        cls.user = create_user('shopper')
+        for recipe in (
+            create_recipe(author, [eggs, milk]),
+            create_recipe(author, [eggs], name='Pancakes'),
+        ):
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def download(self, file_format=None):
+        params = {} if file_format is None else {'file_format': file_format}
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, 200)
+        extension = file_format or 'txt'
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename="shopping_list.{extension}"'
+        )
+        return response, b''.join(response.streaming_content)
+
+    def test_txt(self):
+        for file_format in (None, 'txt'):
+            with self.subTest(file_format=file_format):
+                response, body = self.download(file_format)
+                self.assertTrue(response['Content-Type'].startswith(
+                    'text/plain'))
+                self.assertEqual(
+                    body.decode(),
+                    'Shopping List:\n\n'
+                    '1. eggs (pcs) - 20\n'
+                    '2. milk (ml) - 10\n'
+                )
+
+    def test_csv(self):
+        response, body = self.download('csv')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertEqual(list(csv.reader(io.StringIO(body.decode()))), [
+            ['name', 'measurement_unit', 'amount'],
+            ['eggs', 'pcs', '20'],
+            ['milk', 'ml', '10'],
+        ])
+
+    def test_pdf(self):
+        response, body = self.download('pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(body.startswith(b'%PDF'))
+
+    def test_unsupported_format(self):
+        response = self.client.get(self.URL, {'file_format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('txt, csv, pdf', response.json()['errors'])
+
+    def test_anonymous(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.URL).status_code, 401)
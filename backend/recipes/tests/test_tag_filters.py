@@ -0,0 +1,44 @@
+from recipes.models import Tag
+from recipes.tests.utils import APITestBase, create_recipe, create_user
+
+
+class TagFilterTests(APITestBase):
+    """Recipes with any of the tags, each listed once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('cook')
+        cls.quick, cls.cheap, cls.vegan = (
+            Tag.objects.create(name=name.title(), slug=f'{name}-test')
+            for name in ('quick', 'cheap', 'vegan')
+        )
+        cls.both = create_recipe(
+            author, [], tags=[cls.quick, cls.cheap], name='Both')
+        cls.quick_only = create_recipe(
+            author, [], tags=[cls.quick], name='Quick')
+        cls.untagged = create_recipe(author, [], name='Untagged')
+
+    def get_recipes(self, tags):
+        response = self.client.get('/api/recipes/', {'tags': tags})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_each_recipe_is_listed_once(self):
+        data = self.get_recipes([self.quick.slug, self.cheap.slug])
+        ids = [recipe['id'] for recipe in data['results']]
+        self.assertCountEqual(ids, [self.both.id, self.quick_only.id])
+        self.assertEqual(data['count'], 2)
+
+    def test_single_tag(self):
+        data = self.get_recipes([self.cheap.slug])
+        self.assertEqual(
+            [recipe['id'] for recipe in data['results']], [self.both.id])
+
+    def test_unused_tag(self):
+        self.assertEqual(self.get_recipes([self.vegan.slug])['count'], 0)
+
+    def test_unknown_tag_is_rejected(self):
+        response = self.client.get(
+            '/api/recipes/', {'tags': [self.quick.slug, 'no-such-tag']})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.json())
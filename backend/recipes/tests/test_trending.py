@@ -0,0 +1,62 @@
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.tests.utils import APITestBase, create_recipe, create_user
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=48, TRENDING_WINDOW_DAYS=14)
+class TrendingOrderingTests(APITestBase):
+    """Recent activity outranks more but older activity."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('cook')
+        cls.fans = [create_user(f'fan{index}') for index in range(4)]
+        cls.fresh = create_recipe(author, [], name='Fresh')
+        cls.older = create_recipe(author, [], name='Older')
+        cls.stale = create_recipe(author, [], name='Stale')
+        cls.quiet = create_recipe(author, [], name='Quiet')
+        cls.add_activity(Favorite, cls.fresh, 1, timedelta(hours=1))
+        # Three favorites five half-lives ago weigh less than one now.
+        cls.add_activity(Favorite, cls.older, 3, timedelta(days=10))
+        cls.add_activity(Favorite, cls.stale, 4, timedelta(days=20))
+        cls.add_activity(ShoppingCart, cls.stale, 4, timedelta(days=20))
+
+    @classmethod
+    def add_activity(cls, model, recipe, count, age):
+        for fan in cls.fans[:count]:
+            model.objects.create(user=fan, recipe=recipe)
+        model.objects.filter(recipe=recipe).update(
+            created_at=timezone.now() - age)
+
+    def refresh(self):
+        call_command('refresh_trending_scores', stdout=io.StringIO())
+
+    def get_names(self):
+        response = self.client.get('/api/recipes/', {'ordering': 'trending'})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.json()['results']]
+
+    def get_score(self, recipe):
+        return Recipe.objects.get(pk=recipe.pk).trending_score
+
+    def test_recent_activity_ranks_first(self):
+        self.refresh()
+        self.assertGreater(self.get_score(self.fresh), 0.9)
+        self.assertLess(self.get_score(self.older), 0.1)
+        self.assertEqual(self.get_names(), ['Fresh', 'Older', 'Quiet', 'Stale'])
+
+    def test_activity_outside_the_window_is_ignored(self):
+        self.refresh()
+        self.assertEqual(self.get_score(self.stale), 0)
+        with override_settings(TRENDING_WINDOW_DAYS=30):
+            self.refresh()
+        self.assertGreater(self.get_score(self.stale), 0)
+        self.refresh()
+        # A score that left the window cools down to zero.
+        self.assertEqual(self.get_score(self.stale), 0)
@@ -0,0 +1,108 @@
+import base64
+import io
+import json
+import os
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.tests.utils import APITestBase, create_user
+from users.constants import ImageStatus
+
+AVATAR_URL = '/api/users/me/avatar/'
+
+
+def make_png(side=64):
+    """Return PNG bytes of random pixels, which do not compress."""
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(
+        buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def to_base64(data, content_type='image/png'):
+    return f'data:{content_type};base64,' + base64.b64encode(data).decode()
+
+
+class UploadTests(APITestBase):
+    """Images arrive as multipart files or base64 within size limits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('cook')
+        cls.eggs = Ingredient.objects.create(name='eggs', measurement_unit='g')
+        cls.tag = Tag.objects.create(name='Quick', slug='quick-test')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def put_avatar(self, avatar, format='json'):
+        return self.client.put(AVATAR_URL, {'avatar': avatar}, format=format)
+
+    def test_multipart_recipe_create(self):
+        response = self.client.post('/api/recipes/', {
+            'ingredients': json.dumps([{'id': self.eggs.id, 'amount': 3}]),
+            'tags': [self.tag.id],
+            'name': 'Omelette',
+            'text': 'Whisk and fry.',
+            'cooking_time': 10,
+            'image': SimpleUploadedFile('dish.png', make_png(), 'image/png'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        recipe = Recipe.objects.get(pk=response.json()['id'])
+        self.assertEqual(recipe.image_status, ImageStatus.PENDING)
+        self.assertTrue(recipe.image.name.endswith('.png'))
+        self.assertEqual(
+            list(recipe.tags.values_list('id', flat=True)), [self.tag.id])
+
+    def test_multipart_avatar(self):
+        response = self.put_avatar(
+            SimpleUploadedFile('me.png', make_png(), 'image/png'),
+            format='multipart')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['avatar_status'], ImageStatus.PENDING)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024)
+    def test_oversize_multipart_avatar(self):
+        image = make_png()
+        self.assertGreater(len(image), 1024)
+        response = self.put_avatar(
+            SimpleUploadedFile('me.png', image, 'image/png'),
+            format='multipart')
+        self.assertEqual(response.status_code, 413)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.avatar)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024,
+                       DATA_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_oversize_declared_length(self):
+        response = self.put_avatar(
+            SimpleUploadedFile('me.png', make_png(), 'image/png'),
+            format='multipart')
+        self.assertEqual(response.status_code, 413)
+
+    def test_multipart_non_image(self):
+        response = self.put_avatar(
+            SimpleUploadedFile('me.png', b'plain text', 'image/png'),
+            format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024)
+    def test_oversize_base64(self):
+        response = self.put_avatar(to_base64(make_png()))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('avatar', response.json())
+
+    def test_invalid_base64(self):
+        for avatar in (
+            'data:image/png;base64,not*base64',
+            to_base64(b'plain text'),
+            to_base64(b'plain text', 'text/plain'),
+        ):
+            with self.subTest(avatar=avatar):
+                response = self.put_avatar(avatar)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('avatar', response.json())
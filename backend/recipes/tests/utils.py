@@ -0,0 +1,67 @@
+import base64
+import io
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from api.authentication import token_cache
+from recipes.catalog import bump_catalog_version
+from recipes.models import Recipe, RecipeIngredient
+from recipes.services import update_ingredient_arrays
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_base64_image(size=(64, 64)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+def create_user(username):
+    return User.objects.create_user(
+        email=f'{username}@example.com',
+        username=username,
+        first_name=username.title(),
+        last_name='Tester',
+        password='Secret-pass-123'
+    )
+
+
+def create_recipe(author, ingredients, tags=(), name='Recipe'):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text='Mix and cook.',
+        cooking_time=20,
+        image='recipes/images/test.png'
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+        for ingredient in ingredients
+    )
+    recipe.tags.set(tags)
+    update_ingredient_arrays([recipe.id])
+    return recipe
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class APITestBase(APITestCase):
+    """Starts every test with cold caches and a throwaway media root."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        token_cache.clear()
+        bump_catalog_version()
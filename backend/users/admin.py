@@ -7,7 +7,8 @@ from users.models import Subscription, User
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
     list_display = ('email', 'id', 'username',
-                    'first_name', 'last_name', 'is_staff')
+                    'first_name', 'last_name', 'is_staff',
+                    'recipes_count', 'followers_count')
     list_filter = ('is_staff', 'is_superuser', 'is_active')
     search_fields = ('email', 'username', 'first_name', 'last_name')
     list_display_links = ('email', 'id', 'username')
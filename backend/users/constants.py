@@ -1 +1,11 @@
+from django.db import models
+
 FIELD_MAX_LENGTH = 265
+
+
+class ImageStatus(models.TextChoices):
+    """Processing state of an uploaded image."""
+
+    READY = 'ready', 'Ready'
+    PENDING = 'pending', 'Pending'
+    FAILED = 'failed', 'Failed'
@@ -2,7 +2,7 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db import models
 
-from users.constants import FIELD_MAX_LENGTH
+from users.constants import FIELD_MAX_LENGTH, ImageStatus
 
 forbidden_username_validator = RegexValidator(
     regex=r'^(?!me$).*',
@@ -39,6 +39,17 @@ class User(AbstractUser):
         blank=True,
         verbose_name='Avatar'
     )
+    avatar_variants = models.JSONField(
+        default=dict, blank=True, editable=False,
+        verbose_name='Avatar Variants')
+    avatar_status = models.CharField(
+        max_length=16, choices=ImageStatus.choices,
+        default=ImageStatus.READY, editable=False,
+        verbose_name='Avatar Status')
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Recipes')
+    followers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Followers')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -0,0 +1,59 @@
+from recipes.models import Ingredient
+from recipes.tests.utils import APITestBase, create_recipe, create_user
+from users.models import Subscription, User
+
+# The count and the page, plus the viewer's subscribed authors.
+USER_LIST_QUERIES = 3
+# The viewer's subscribed authors; the user comes from authentication.
+ME_QUERIES = 1
+# The count, the page of authors, their recipe previews and the
+# viewer's subscribed authors.
+SUBSCRIPTIONS_QUERIES = 4
+
+
+class UserQueryTests(APITestBase):
+    """is_subscribed is resolved once per response, not once per user."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = create_user('viewer')
+        cls.eggs = Ingredient.objects.create(name='eggs', measurement_unit='g')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.viewer)
+
+    def add_authors(self, count):
+        for index in range(User.objects.count(), User.objects.count() + count):
+            author = create_user(f'author{index}')
+            create_recipe(author, [self.eggs])
+            create_recipe(author, [self.eggs])
+            Subscription.objects.create(user=self.viewer, author=author)
+
+    def assert_flat(self, url, queries, expected_results):
+        for total in (1, 5):
+            with self.subTest(url=url, authors=total):
+                self.add_authors(total - Subscription.objects.filter(
+                    user=self.viewer).count())
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                if expected_results:
+                    self.assertTrue(all(
+                        user['is_subscribed']
+                        for user in data['results']
+                        if user['id'] != self.viewer.id
+                    ))
+                    self.assertGreaterEqual(len(data['results']), total)
+
+    def test_users(self):
+        self.assert_flat('/api/users/', USER_LIST_QUERIES, True)
+
+    def test_me(self):
+        self.assert_flat('/api/users/me/', ME_QUERIES, False)
+
+    def test_subscriptions(self):
+        self.assert_flat(
+            '/api/users/subscriptions/?recipes_limit=1',
+            SUBSCRIPTIONS_QUERIES, True)
@@ -0,0 +1,48 @@
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from recipes.tests.utils import APITestBase, create_user
+
+ME_URL = '/api/users/me/'
+
+
+class TokenCacheTests(APITestBase):
+    """A cached token stops working as soon as it is revoked."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('cook')
+        response = self.client.post('/api/auth/token/login/', {
+            'email': 'cook@example.com', 'password': 'Secret-pass-123'})
+        self.assertEqual(response.status_code, 200)
+        self.key = response.json()['auth_token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.key}')
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+        self.assertIsNotNone(token_cache.get(self.key))
+
+    def assert_revoked(self):
+        self.assertIsNone(token_cache.get(self.key))
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
+
+    def test_cached_token_skips_the_token_query(self):
+        # Only the viewer's subscribed authors are queried.
+        with self.assertNumQueries(1):
+            response = self.client.get(ME_URL)
+        self.assertEqual(response.json()['username'], 'cook')
+
+    def test_logout(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assert_revoked()
+
+    def test_deleted_token(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.filter(key=self.key).delete()
+        self.assert_revoked()
+
+    def test_deactivated_user(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assert_revoked()
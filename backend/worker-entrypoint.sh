@@ -0,0 +1,15 @@
+#!/bin/sh
+set -e
+
+# Migrations and static files belong to the backend service; workers
+# only wait until the schema is up to date.
+echo "Waiting for migrations..."
+
+until python manage.py migrate --check > /dev/null 2>&1; do
+  echo "Migrations are not applied yet - sleeping"
+  sleep 1
+done
+
+echo "Migrations applied"
+
+exec "$@"